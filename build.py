@@ -1,15 +1,32 @@
 ﻿#!/usr/bin/env python3
 """
 Z1 Onyx Cluster - Build Script
-Cross-platform build automation for controller and node firmware
+Cross-platform build automation for controller, bootloader and node firmware
 Uses tools from system PATH - no hardcoded paths
 """
 
 import os
+import functools
+import hashlib
+import json
 import sys
 import subprocess
 import shutil
+import struct
+import tempfile
+from dataclasses import dataclass
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Add build_tools to PATH immediately
+PROJECT_ROOT = Path(__file__).resolve().parent
+BUILD_TOOLS_PATH = str(PROJECT_ROOT / "build_tools")
+os.environ['PATH'] = BUILD_TOOLS_PATH + os.pathsep + os.environ.get('PATH', '')
+
+# Header/merge tools run in-process rather than as one Python subprocess per node
+sys.path.insert(0, BUILD_TOOLS_PATH)
+import prepend_app_header
+import merge_dual_partition
 
 # ANSI color codes
 class Colors:
@@ -29,25 +46,38 @@ def print_step(step, msg):
     print(f"{Colors.CYAN}Step {step}: {msg}...{Colors.RESET}")
 
 def print_success(msg):
-    print(f"  {Colors.GREEN} {msg}{Colors.RESET}")
+    print(f"  {Colors.GREEN}[OK] {msg}{Colors.RESET}")
 
 def print_warning(msg):
-    print(f"  {Colors.YELLOW} {msg}{Colors.RESET}")
+    print(f"  {Colors.YELLOW}[WARN] {msg}{Colors.RESET}")
 
 def print_error(msg):
-    print(f"{Colors.RED} {msg}{Colors.RESET}")
+    print(f"{Colors.RED}[ERROR] {msg}{Colors.RESET}")
+
+@functools.lru_cache(maxsize=None)
+def locate_tool(name, check_build_tools=False):
+    """Path of tool in build_tools (if requested) or PATH, or None
+
+    Cached - shutil.which walks and stats every PATH entry, so each tool is
+    resolved once per process.
+    """
+    if check_build_tools:
+        build_tools_path = PROJECT_ROOT / "build_tools" / f"{name}.exe"
+        if build_tools_path.exists():
+            return str(build_tools_path)
+    return shutil.which(name)
 
-def find_tool(name, required=False):
-    """Find tool in PATH"""
-    tool = shutil.which(name)
+def find_tool(name, required=False, check_build_tools=False):
+    """Find tool in PATH or build_tools directory"""
+    tool = locate_tool(name, check_build_tools)
     if tool:
         print_success(f"Found {name}: {tool}")
         return tool
     elif required:
-        print_error(f"{name} not found in PATH!")
+        print_error(f"{name} not found in PATH or build_tools!")
         return None
     else:
-        print_warning(f"{name} not found in PATH")
+        print_warning(f"{name} not found in PATH or build_tools")
         return None
 
 def run_command(cmd, cwd=None, check=True):
@@ -58,7 +88,13 @@ def run_command(cmd, cwd=None, check=True):
             cwd=cwd,
             check=check,
             capture_output=False,
-            shell=False
+            shell=False,
+            # Python's own fds are non-inheritable (PEP 446), so closing every
+            # fd in the child is wasted work - and it rules out posix_spawn
+            close_fds=False
+            # No env= on purpose: os.environ edits (PATH, CCACHE_*) already reach
+            # the process environment via putenv, and the child inherits it as-is.
+            # Passing env= would re-encode the whole mapping on every call.
         )
         return result.returncode == 0
     except subprocess.CalledProcessError as e:
@@ -69,327 +105,534 @@ def run_command(cmd, cwd=None, check=True):
         print_error(f"Command not found: {cmd[0]}")
         return False
 
+def find_compiler_launcher(project_root):
+    """Find sccache/ccache and configure it for maximum cache hits"""
+    launcher = locate_tool("sccache") or locate_tool("ccache")
+    if launcher:
+        print_success(f"Found compiler cache: {launcher}")
+        # Hash paths relative to the project so caches are shared across checkouts
+        os.environ.setdefault("CCACHE_BASEDIR", str(project_root))
+        os.environ.setdefault("CCACHE_COMPILERCHECK", "content")
+    else:
+        print_warning("ccache/sccache not found in PATH (builds will not be cached)")
+    return launcher
+
+def launcher_opts(launcher):
+    """CMake options that route compiler invocations through launcher
+
+    With no launcher the variables are set empty, so a reconfigure also drops
+    a launcher cached by an earlier run.
+    """
+    return [f"-DCMAKE_{lang}_COMPILER_LAUNCHER={launcher or ''}" for lang in ("C", "CXX", "ASM")]
+
+def _kernel_copy(src_fd, dst_fd, size):
+    """Copy size bytes between fds without going through Python; False if unsupported"""
+    for copy in (lambda offset, count: os.copy_file_range(src_fd, dst_fd, count, offset, offset),
+                 lambda offset, count: os.sendfile(dst_fd, src_fd, offset, count)):
+        offset = 0
+        try:
+            while offset < size:
+                copied = copy(offset, size - offset)
+                if copied == 0:
+                    break
+                offset += copied
+            return True
+        except (AttributeError, OSError):
+            continue  # not available on this platform/filesystem - try the next one
+    return False
+
+def copy_file(src, dst):
+    """Copy src to dst with metadata
+
+    The destination is pre-sized with posix_fallocate so slow storage (SD card,
+    network mount) allocates it in one go, then filled with a kernel-side copy
+    where available or 1 MiB reads otherwise.
+    """
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        if size and hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(fdst.fileno(), 0, size)
+            except OSError:
+                pass  # unsupported filesystem - space is allocated as we write
+        if not _kernel_copy(fsrc.fileno(), fdst.fileno(), size):
+            fsrc.seek(0)
+            fdst.seek(0)
+            shutil.copyfileobj(fsrc, fdst, length=1 << 20)
+            fdst.truncate()
+    shutil.copystat(src, dst)
+
+def file_digest(path):
+    """BLAKE2b digest of a file's contents"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.digest()
+
+def copy_if_changed(src, dst, src_size=None):
+    """Copy src to dst unless dst already has identical contents
+
+    Unchanged files keep their mtime, so OTA tools, archivers and rsync
+    don't see a spurious update. Returns True if dst was written.
+    """
+    if src_size is None:
+        src_size = src.stat().st_size
+    try:
+        unchanged = dst.stat().st_size == src_size and file_digest(src) == file_digest(dst)
+    except FileNotFoundError:
+        unchanged = False
+    if unchanged:
+        return False
+    copy_file(src, dst)
+    return True
+
+def copy_files(pairs, max_workers=8):
+    """Copy (src, dst) pairs concurrently; returns {dst: size} for sources that existed
+
+    The existence check runs in the workers too, so no per-file stat is left
+    serialised in front of the pool. Each source and destination is stat'ed
+    once, and the size is handed back so callers needn't stat again.
+    """
+    def copy_pair(pair):
+        src, dst = pair
+        try:
+            size = src.stat().st_size
+        except FileNotFoundError:
+            return None
+        copy_if_changed(src, dst, size)
+        return size
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pairs)))) as pool:
+        sizes = list(pool.map(copy_pair, pairs))
+    return {dst: size for (_, dst), size in zip(pairs, sizes) if size is not None}
+
+def create_dual_uf2(bootloader_uf2, app_bin, output_uf2, name="Z1 Node App", version=(1, 0, 0), crc32=None):
+    """Prepend app header and merge with bootloader UF2 (no intermediate files)
+
+    crc32 may be passed when already known for app_bin. Any failure is reported
+    as RuntimeError, like the other build steps.
+    """
+    try:
+        with merge_dual_partition.map_binary(app_bin) as app_data:
+            app_image = prepend_app_header.create_app_header(app_data, name, version, crc32) + app_data
+        merge_dual_partition.merge_app_image_to_uf2(bootloader_uf2, app_image, output_uf2, verbose=False)
+    except (OSError, ValueError, struct.error) as e:
+        raise RuntimeError(f"Dual-partition merge failed for {Path(app_bin).name}: {e}") from e
+
+def needs_rebuild(src, dst):
+    """True if dst is missing or older than src"""
+    return not dst.exists() or src.stat().st_mtime > dst.stat().st_mtime
+
+def read_cmake_cache(cmake_cache, *names):
+    """Return {name: value} for the given CMakeCache.txt entries
+
+    Streams the file line by line and stops as soon as every entry is found.
+    """
+    values = {}
+    if not cmake_cache.exists():
+        return values
+    with cmake_cache.open(encoding="utf-8", errors="replace") as f:
+        for line in f:
+            # Entries look like NAME:TYPE=VALUE; comments never match a name
+            name, sep, rest = line.partition(":")
+            if sep and name in names and "=" in rest:
+                values[name] = rest.split("=", 1)[1].rstrip("\n")
+                if len(values) == len(names):
+                    break
+    return values
+
+def same_path(a, b):
+    """True if a and b name the same location (symlinks, slashes and case normalised)"""
+    return os.path.normcase(os.path.realpath(a)) == os.path.normcase(os.path.realpath(b))
+
+def stale_cache_reason(cache, ninja, project_root, build_dir):
+    """Why cached CMake entries can't be reused with the current environment, or None"""
+    checks = (("PICO_SDK_PATH", os.environ.get("PICO_SDK_PATH")), ("CMAKE_MAKE_PROGRAM", ninja),
+              # These differ when the tree (or build dir) was moved or copied elsewhere
+              ("CMAKE_HOME_DIRECTORY", str(project_root)), ("CMAKE_CACHEFILE_DIR", str(build_dir)))
+    for name, current in checks:
+        cached = cache.get(name)
+        # CMake writes forward slashes on Windows too - normalise before comparing
+        if cached and current and not same_path(cached, current):
+            return f"{name} changed ({cached} -> {current})"
+    return None
+
+def ninja_jobs():
+    """Number of CPUs actually available to this process"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 2
+
+@dataclass
+class NodeApp:
+    """One node application and the dual-partition UF2 built from it"""
+    target: str         # CMake target, e.g. node_app_12_0
+    header_name: str    # Name stored in the 192-byte app header
+
+    @property
+    def dual_name(self):
+        return self.target.replace("node_app", "node_dual")
+
+@dataclass
+class VariantConfig:
+    """Everything that differs between the V1 and V2 hardware builds"""
+    name: str
+    cmake_flags: list
+    release_subdir: str
+    controller: str
+    bootloader: str
+    node_apps: list
+
+    def targets(self, dual_only=False):
+        apps = [app.target for app in self.node_apps]
+        if dual_only:
+            return [self.bootloader] + apps
+        return [self.controller, self.bootloader] + apps
+
+CONFIGS = {
+    # V1: 12 nodes with compile-time node IDs - one app per node
+    "V1": VariantConfig(
+        name="V1",
+        cmake_flags=["-DBUILD_HW_V1=ON", "-DBUILD_HW_V2=OFF"],
+        release_subdir="12node",
+        controller="controller_12",
+        bootloader="bootloader_12",
+        node_apps=[NodeApp(f"node_app_12_{i}", f"Z1 Node {i}") for i in range(12)],
+    ),
+    # V2: 16 nodes with runtime ID detection - single app for all nodes
+    "V2": VariantConfig(
+        name="V2",
+        cmake_flags=["-DBUILD_HW_V1=OFF", "-DBUILD_HW_V2=ON"],
+        release_subdir="16node",
+        controller="controller_16",
+        bootloader="bootloader_16",
+        node_apps=[NodeApp("node_app_16", "Z1 Node App")],
+    ),
+}
+
+def build_variant(hw_version, project_root, cmake, ninja, launcher, jobs, verbose=False, dual_only=False,
+                  load_limit=None):
+    """Configure, build and package one hardware variant (V1 or V2)
+
+    load_limit caps ninja on the system-wide load average (default: jobs). When
+    variants build side by side, pass the total CPU budget rather than this
+    variant's share, since the other variant's load counts too.
+
+    Returns the manifest of produced files as (path relative to project root, size) pairs.
+    """
+    config = CONFIGS[hw_version]
+    release_dir = project_root / "FirmwareReleases" / config.release_subdir
+    apponly_dir = release_dir / "apponly"
+    packages_dir = project_root / "packages"
+    apponly_dir.mkdir(parents=True, exist_ok=True)
+    
+    print(f"\n{Colors.CYAN}{Colors.BOLD}{'='*70}{Colors.RESET}")
+    print(f"{Colors.CYAN}{Colors.BOLD}Building {hw_version} Hardware{Colors.RESET}")
+    print(f"{Colors.CYAN}{Colors.BOLD}{'='*70}{Colors.RESET}\n")
+
+    # Each variant has its own build directory so switching variants
+    # never invalidates the other's CMake cache and Ninja state
+    build_dir = project_root / f"build_{hw_version.lower()}"
+    build_dir.mkdir(exist_ok=True)
+
+    # Step 2: Configure with CMake
+    cmake_opts = [cmake, "-G", "Ninja", "-DCMAKE_BUILD_TYPE=Release"]
+    cmake_opts.extend(config.cmake_flags)
+    cmake_opts.extend(launcher_opts(launcher))
+    cmake_opts.append(str(project_root))
+    
+    # The cache records absolute source/tool/SDK paths - if those moved, cached
+    # state is stale and produces confusing build errors, so start from scratch
+    cache = read_cmake_cache(build_dir / "CMakeCache.txt",
+                             "BUILD_HW_V1", "BUILD_HW_V2", "PICO_SDK_PATH", "CMAKE_MAKE_PROGRAM",
+                             "CMAKE_HOME_DIRECTORY", "CMAKE_CACHEFILE_DIR", "CMAKE_C_COMPILER_LAUNCHER")
+    reason = stale_cache_reason(cache, ninja, project_root, build_dir)
+    if reason:
+        print_warning(f"{reason}, wiping {build_dir.name}/")
+        shutil.rmtree(build_dir)
+        build_dir.mkdir()
+        cache = {}
+    
+    # Build directory is pinned to one variant - only configure once
+    needs_reconfigure = not (build_dir / "build.ninja").exists()
+    if not needs_reconfigure:
+        # Guard against the directory having been reconfigured by hand for the other variant
+        if cache.get(f"BUILD_HW_{hw_version}") != "ON":
+            needs_reconfigure = True
+            print_warning(f"Build directory not configured for {hw_version}, reconfiguring...")
+        # ccache installed/removed since the last configure, or --no-ccache toggled
+        elif cache.get("CMAKE_C_COMPILER_LAUNCHER", "") != (launcher or ""):
+            needs_reconfigure = True
+            print_warning("Compiler launcher changed, reconfiguring...")
+    
+    if needs_reconfigure:
+        print_step(2, f"Configuring build for {hw_version}")
+        if not run_command(cmake_opts, cwd=build_dir):
+            raise RuntimeError(f"{hw_version} CMake configuration failed!")
+        print_success(f"{hw_version} CMake configuration complete")
+    else:
+        print_step(2, f"Build already configured for {hw_version}")
+
+    # Step 3: Build firmware
+    print_step(3, f"Building {hw_version} firmware")
+    targets = config.targets(dual_only)
+    
+    # -k 0: keep building independent targets after a failure to surface every error
+    ninja_cmd = [ninja, "-j", str(jobs), "-k", "0"]
+    if len(config.node_apps) > 1:
+        # Many node apps to link - cap on load average to avoid oversubscription
+        ninja_cmd += ["-l", str(load_limit or jobs)]
+    if verbose:
+        ninja_cmd += ["-d", "stats"]
+    
+    if not run_command(ninja_cmd + targets, cwd=build_dir):
+        raise RuntimeError(f"{hw_version} build failed!")
+
+    print_success(f"{hw_version} build complete")
+    
+    # Step 4: Prepend app headers and merge into dual-partition UF2(s) in-process
+    print_step(4, f"Creating {hw_version} dual-partition UF2")
+    
+    bootloader_uf2 = build_dir / "bootloader" / f"{config.bootloader}.uf2"
+    if not bootloader_uf2.exists():
+        raise RuntimeError(f"Bootloader UF2 not found: {bootloader_uf2}")
+    
+    # Skip nodes whose inputs (bootloader, app binary, header name and the
+    # header/merge tools themselves) are unchanged since the last merge
+    merge_manifest = build_dir / ".merge_manifest.json"
+    try:
+        previous_inputs = json.loads(merge_manifest.read_text())
+    except (OSError, ValueError):
+        previous_inputs = {}
+    shared_digest = b"".join(file_digest(path) for path in
+                             (prepend_app_header.__file__, merge_dual_partition.__file__, bootloader_uf2))
+    
+    merges = []
+    current_inputs = {}
+    crcs = {}  # Byte-identical binaries (nodes sharing firmware) share one CRC
+    for app in config.node_apps:
+        app_bin = build_dir / "node" / f"{app.target}.bin"
+        if not app_bin.exists():
+            raise RuntimeError(f"App binary not found: {app_bin}")
+        output_uf2 = release_dir / f"{app.dual_name}.uf2"
+        app_digest = file_digest(app_bin)
+        inputs = shared_digest + app_digest + app.header_name.encode()
+        current_inputs[output_uf2.name] = hashlib.blake2b(inputs, digest_size=16).hexdigest()
+        if previous_inputs.get(output_uf2.name) == current_inputs[output_uf2.name] and output_uf2.exists():
+            continue
+        if app_digest not in crcs:
+            with merge_dual_partition.map_binary(app_bin) as app_data:
+                crcs[app_digest] = prepend_app_header.calculate_crc32(app_data)
+        merges.append((bootloader_uf2, app_bin, output_uf2, app.header_name, (1, 0, 0), crcs[app_digest]))
+    
+    # Nodes are independent and the header/merge work is CPU-bound Python, so
+    # fan V1's nodes out across processes rather than threads (GIL)
+    if len(merges) > 1:
+        with ProcessPoolExecutor(max_workers=min(len(merges), os.cpu_count() or 1)) as pool:
+            list(pool.map(create_dual_uf2, *zip(*merges)))
+    else:
+        for merge in merges:
+            create_dual_uf2(*merge)
+    merge_manifest.write_text(json.dumps(current_inputs, indent=2) + "\n")
+    
+    if len(merges) < len(config.node_apps):
+        print_success(f"{len(config.node_apps) - len(merges)} of {len(config.node_apps)} unchanged - merge skipped")
+    print_success(describe_files([f"{app.dual_name}.uf2" for app in config.node_apps], "root"))
+    
+    # Step 5: Copy individual files to release directories
+    print_step(5, f"Copying {hw_version} firmware to releases")
+    
+    # Controller goes in root, bootloader and app UF2s in apponly/, app binaries in packages/ for OTA
+    copies = []
+    if not dual_only:
+        copies.append((build_dir / "controller" / f"{config.controller}.uf2", release_dir / f"{config.controller}.uf2"))
+    copies.append((bootloader_uf2, apponly_dir / f"{config.bootloader}.uf2"))
+    for app in config.node_apps:
+        node_out = build_dir / "node" / app.target
+        copies.append((node_out.with_suffix(".uf2"), apponly_dir / f"{app.target}.uf2"))
+        copies.append((node_out.with_suffix(".bin"), packages_dir / f"{app.target}.bin"))
+    
+    sizes = copy_files(copies)
+    for src, dst in copies:
+        if dst not in sizes:
+            print_warning(f"{src.name} not found - not copied")
+    copied = list(sizes)
+    
+    # Per-node files are summarised on one line when there are several
+    app_targets = {app.target for app in config.node_apps}
+    grouped = len(app_targets) > 1
+    for dst in copied:
+        if grouped and Path(dst.name).stem in app_targets:
+            continue
+        size_kb = sizes[dst] / 1024
+        location = "root" if dst.parent == release_dir else f"{dst.parent.name}/"
+        print_success(f"{dst.name} ({size_kb:.1f} KB) → {location}")
+    if grouped:
+        print_success(describe_files([f"{app.target}.uf2" for app in config.node_apps], "apponly/"))
+        print_success(describe_files([f"{app.target}.bin" for app in config.node_apps], "packages/"))
+    
+    # Record every output with the size already known from the merge/copy, in a
+    # fixed order: root, apponly/, packages/. The final report prints from this
+    # and MANIFEST.json gives OTA tooling something to diff between builds.
+    dual_files = [release_dir / f"{app.dual_name}.uf2" for app in config.node_apps]
+    sizes.update((path, path.stat().st_size) for path in dual_files)
+    placement = {release_dir: 0, apponly_dir: 1, packages_dir: 2}
+    outputs = ([dst for dst in copied if dst.parent == release_dir] + dual_files
+               + sorted((dst for dst in copied if dst.parent != release_dir),
+                        key=lambda dst: placement[dst.parent]))
+    
+    release_entries = [{"file": path.relative_to(release_dir).as_posix(), "size": sizes[path]}
+                       for path in outputs if release_dir in path.parents]
+    manifest_json = json.dumps({"variant": hw_version, "files": release_entries}, indent=2) + "\n"
+    (release_dir / "MANIFEST.json").write_text(manifest_json)
+    
+    return [(path.relative_to(project_root).as_posix(), sizes[path]) for path in outputs]
+
+def describe_files(names, label):
+    """One-line summary like 'a.uf2 through b.uf2 (12 files) → root'"""
+    if len(names) == 1:
+        return f"{names[0]} → {label}"
+    return f"{names[0]} through {names[-1]} ({len(names)} files) → {label}"
+
+def build_variant_logged(*args):
+    """Run build_variant with all output (including tool subprocesses) captured
+
+    Returns (log_text, error_message, manifest) - error_message is None on success.
+    """
+    with tempfile.TemporaryFile() as log:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        saved_fds = (os.dup(1), os.dup(2))
+        os.dup2(log.fileno(), 1)
+        os.dup2(log.fileno(), 2)
+        error = None
+        manifest = []
+        try:
+            manifest = build_variant(*args)
+        except Exception as e:
+            error = f"{args[0]}: {e}"
+            import traceback
+            traceback.print_exc()
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(saved_fds[0], 1)
+            os.dup2(saved_fds[1], 2)
+            os.close(saved_fds[0])
+            os.close(saved_fds[1])
+        log.seek(0)
+        return log.read().decode(errors="replace"), error, manifest
+
 def main():
     # Parse command line arguments
     import argparse
     parser = argparse.ArgumentParser(description="Z1 Onyx Cluster Build Script")
     parser.add_argument("--hw-v1", action="store_true", help="Build ONLY V1 hardware (12 nodes)")
     parser.add_argument("--hw-v2", action="store_true", help="Build ONLY V2 hardware (16 nodes)")
+    parser.add_argument("--dual-only", action="store_true",
+                        help="Build only bootloader + node apps (dual-partition/OTA firmware), skip the controller")
+    parser.add_argument("--no-ccache", action="store_true", help="Do not use ccache/sccache as compiler launcher")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="Parallel ninja jobs (default: available CPUs)")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Show ninja scheduling statistics")
     args = parser.parse_args()
     
-    # Default: Build BOTH hardware versions if neither specified
-    if not args.hw_v1 and not args.hw_v2:
-        build_both = True
-        hw_versions = ["V1", "V2"]
-    elif args.hw_v1 and args.hw_v2:
-        build_both = True
+    # Default: Build BOTH hardware versions if neither (or both) specified
+    if args.hw_v1 == args.hw_v2:
         hw_versions = ["V1", "V2"]
     elif args.hw_v1:
-        build_both = False
         hw_versions = ["V1"]
     else:
-        build_both = False
         hw_versions = ["V2"]
+    build_both = len(hw_versions) > 1
     
     # Paths
-    project_root = Path(__file__).parent.absolute()
-    build_dir = project_root / "build"
+    project_root = PROJECT_ROOT
     release_dir = project_root / "FirmwareReleases"
     packages_dir = project_root / "packages"
 
-    print_header(f"Z1 Onyx Cluster - Build Script")
+    print_header("Z1 Onyx Dual Partition Build" if args.dual_only else "Z1 Onyx Cluster - Build Script")
     if build_both:
         print(f"{Colors.CYAN}Building: V1 (12-node) + V2 (16-node){Colors.RESET}\n")
     else:
         print(f"{Colors.CYAN}Building: {hw_versions[0]}{Colors.RESET}\n")
     
-    # Check required environment
-    print_step(0, "Checking build environment")
-    
-    pico_sdk = os.environ.get('PICO_SDK_PATH')
-    if not pico_sdk:
-        print_error("PICO_SDK_PATH environment variable not set!")
-        sys.exit(1)
-    print_success(f"PICO_SDK_PATH: {pico_sdk}")
-    
-    cmake = find_tool("cmake", required=True)
-    ninja = find_tool("ninja", required=True)
-    
-    if not cmake or not ninja:
-        print_error("Required tools not found in PATH!")
-        sys.exit(1)
-
-    # Create directories
-    build_dir.mkdir(exist_ok=True)
-    release_dir.mkdir(exist_ok=True)
-    packages_dir.mkdir(exist_ok=True)
+    try:
+        # Step 0: Check environment
+        print_step(0, "Checking build environment")
+        
+        pico_sdk = os.environ.get("PICO_SDK_PATH")
+        if not pico_sdk:
+            raise RuntimeError("PICO_SDK_PATH environment variable not set!")
+        print_success(f"PICO_SDK_PATH: {pico_sdk}")
+        
+        # Check required tools
+        cmake = find_tool("cmake", required=True)
+        ninja = find_tool("ninja", required=True)
+        
+        if not all([cmake, ninja]):
+            raise RuntimeError("Required build tools not found in PATH!")
+        
+        launcher = None if args.no_ccache else find_compiler_launcher(project_root)
 
-    # Change to build directory
-    original_dir = Path.cwd()
-    os.chdir(build_dir)
+        # Create directories
+        release_dir.mkdir(exist_ok=True)
+        packages_dir.mkdir(exist_ok=True)
 
-    try:
         # Step 1: Regenerate PIO headers if pioasm is available (once for both versions)
         print_step(1, "Checking for PIO headers")
-        pioasm = find_tool("pioasm")
+        pioasm = find_tool("pioasm", check_build_tools=True)
         
         if pioasm:
             bus_dir = project_root / "common" / "z1_onyx_bus"
-            run_command([
-                pioasm, "-o", "c-sdk",
-                str(bus_dir / "z1_bus_tx.pio"),
-                str(bus_dir / "z1_bus_tx.pio.h")
-            ])
-            run_command([
-                pioasm, "-o", "c-sdk",
-                str(bus_dir / "z1_bus_rx.pio"),
-                str(bus_dir / "z1_bus_rx.pio.h")
-            ])
-            print_success("PIO headers generated")
+            regenerated = 0
+            for name in ("z1_bus_tx", "z1_bus_rx"):
+                pio_src = bus_dir / f"{name}.pio"
+                pio_hdr = bus_dir / f"{name}.pio.h"
+                # Rewriting an up-to-date header would force ninja to recompile every includer
+                if needs_rebuild(pio_src, pio_hdr):
+                    run_command([pioasm, "-o", "c-sdk", str(pio_src), str(pio_hdr)])
+                    regenerated += 1
+            if regenerated:
+                print_success(f"PIO headers generated ({regenerated} updated)")
+            else:
+                print_success("PIO headers up to date")
         else:
             print_warning("pioasm not found, using pre-generated headers")
 
         # Build each hardware version
-        for hw_version in hw_versions:
-            is_v1 = (hw_version == "V1")
-            print(f"\n{Colors.CYAN}{Colors.BOLD}{'='*70}{Colors.RESET}")
-            print(f"{Colors.CYAN}{Colors.BOLD}Building {hw_version} Hardware{Colors.RESET}")
-            print(f"{Colors.CYAN}{Colors.BOLD}{'='*70}{Colors.RESET}\n")
-
-            # Step 2: Configure with CMake
-            # Step 2: Configure with CMake
-            cmake_opts = [cmake, "-G", "Ninja", "-DCMAKE_BUILD_TYPE=Release"]
-            if is_v1:
-                cmake_opts.extend(["-DBUILD_HW_V1=ON", "-DBUILD_HW_V2=OFF"])
-            else:
-                cmake_opts.extend(["-DBUILD_HW_V1=OFF", "-DBUILD_HW_V2=ON"])
-            cmake_opts.append("..")
-            
-            # Check if hardware variant has changed
-            needs_reconfigure = False
-            cmake_cache = build_dir / "CMakeCache.txt"
-            
-            if not (build_dir / "build.ninja").exists():
-                needs_reconfigure = True
-            elif cmake_cache.exists():
-                # Check if hardware variant matches
-                cache_content = cmake_cache.read_text()
-                current_v1 = "BUILD_HW_V1:BOOL=ON" in cache_content
-                current_v2 = "BUILD_HW_V2:BOOL=ON" in cache_content
-                
-                if is_v1 and not current_v1:
-                    needs_reconfigure = True
-                    print_warning("Hardware variant changed to V1, reconfiguring...")
-                elif not is_v1 and not current_v2:
-                    needs_reconfigure = True
-                    print_warning("Hardware variant changed to V2, reconfiguring...")
-            
-            if needs_reconfigure:
-                print_step(2, f"Configuring build for {hw_version}...")
-                if not run_command(cmake_opts):
-                    raise RuntimeError("CMake configuration failed!")
-                print_success("CMake configuration complete")
-            else:
-                print_step(2, f"Build already configured for {hw_version}")
-
-            # Step 3: Build firmware
-            print_step(3, f"Building {hw_version} firmware")
-
-            if is_v1:
-                # Build V1: controller_12 + bootloader_12 + node_app_12_N (N=0-11)
-                targets = ["controller_12", "bootloader_12"] + [f"node_app_12_{i}" for i in range(12)]
-            else:
-                # Build V2: controller_16 + bootloader_16 + node_app_16
-                targets = ["controller_16", "bootloader_16", "node_app_16"]
-            
-            if not run_command([ninja] + targets):
-                raise RuntimeError(f"{hw_version} build failed!")
-
-            print_success(f"{hw_version} build complete")
-            
-            # Step 4: Copy to release directory
-            print_step(4, f"Copying {hw_version} firmware to releases...")
-
-            hw_release_dir = release_dir / ("12node" if is_v1 else "16node")
-            apponly_dir = hw_release_dir / "apponly"
-            hw_release_dir.mkdir(parents=True, exist_ok=True)
-            apponly_dir.mkdir(parents=True, exist_ok=True)
-
-            copied_count = 0
-            
-            # Controller goes in root (always)
-            controller_name = "controller_12" if is_v1 else "controller_16"
-            src_uf2 = build_dir / f"controller/{controller_name}.uf2"
-            if src_uf2.exists():
-                dst_path = hw_release_dir / f"{controller_name}.uf2"
-                shutil.copy2(src_uf2, dst_path)
-                size_kb = src_uf2.stat().st_size / 1024
-                print_success(f"{controller_name}.uf2 ({size_kb:.1f} KB) → root")
-                copied_count += 1
-            
-            # Copy bootloader and node_app to apponly/ (both V1 and V2)
-            if is_v1:
-                # V1: bootloader_12 and node_app_12_N
-                src_uf2 = build_dir / "bootloader/bootloader_12.uf2"
-                if src_uf2.exists():
-                    dst_path = apponly_dir / "bootloader_12.uf2"
-                    shutil.copy2(src_uf2, dst_path)
-                    size_kb = src_uf2.stat().st_size / 1024
-                    print_success(f"bootloader_12.uf2 ({size_kb:.1f} KB) → apponly/")
-                    copied_count += 1
-                    
-                for i in range(12):
-                    src_uf2 = build_dir / f"node/node_app_12_{i}.uf2"
-                    if src_uf2.exists():
-                        dst_path = apponly_dir / f"node_app_12_{i}.uf2"
-                        shutil.copy2(src_uf2, dst_path)
-                        copied_count += 1
-                print_success(f"node_app_12_0.uf2 through node_app_12_11.uf2 (12 files) → apponly/")
-            else:
-                # V2: bootloader_16 and node_app_16
-                apponly_files = [
-                    ("bootloader/bootloader_16", "bootloader_16"),
-                    ("node/node_app_16", "node_app_16"),
-                ]
-                
-                for src_base, dst_base in apponly_files:
-                    src_uf2 = build_dir / f"{src_base}.uf2"
-                    if src_uf2.exists():
-                        dst_path = apponly_dir / f"{dst_base}.uf2"
-                        shutil.copy2(src_uf2, dst_path)
-                        size_kb = src_uf2.stat().st_size / 1024
-                        print_success(f"{dst_base}.uf2 ({size_kb:.1f} KB) → apponly/")
-                        copied_count += 1
-                    copied_count += 1
-                else:
-                    print_warning(f"UF2 not found for {src_base}")
-
-            if copied_count == 0:
-                raise RuntimeError(f"No {hw_version} firmware files were copied!")
-
-            # Step 5: Create dual-partition firmware (V2 only)
-            if not is_v1:
-                print_step(5, "Creating dual-partition firmware")
-                
-                # First, prepend app header to node binary
-                header_script = project_root / "build_tools" / "prepend_app_header.py"
-                app_bin = build_dir / "node" / "node_app_16.bin"
-                app_with_header = build_dir / "node" / "node_app_16_header.bin"
-                
-                if header_script.exists() and app_bin.exists():
-                    python = shutil.which("python3") or shutil.which("python") or shutil.which("py")
-                    if python:
-                        # Prepend .z1app header to binary
-                        header_cmd = [python, str(header_script), str(app_bin), str(app_with_header)]
-                        if not run_command(header_cmd, check=False):
-                            print_warning("Failed to add app header (non-critical)")
-                            app_with_header = app_bin  # Fall back to raw binary
-                    else:
-                        print_warning("Python not found - using raw binary without header")
-                        app_with_header = app_bin
-                else:
-                    print_warning("Header script or app binary missing - using raw binary")
-                    app_with_header = app_bin
-                
-                # Now merge bootloader + app (with header)
-                merge_script = project_root / "build_tools" / "merge_dual_partition.py"
-                if merge_script.exists():
-                    bootloader_uf2 = build_dir / "bootloader" / "bootloader_16.uf2"
-                    output_uf2 = hw_release_dir / "node_dual_16.uf2"
-                    
-                    if bootloader_uf2.exists() and app_with_header.exists():
-                        python = shutil.which("python3") or shutil.which("python") or shutil.which("py")
-                        if python:
-                            merge_cmd = [python, str(merge_script), str(bootloader_uf2), 
-                                        str(app_with_header), str(output_uf2)]
-                            
-                            if run_command(merge_cmd, check=False):
-                                size_kb = output_uf2.stat().st_size / 1024
-                                print_success(f"node_dual_16.uf2 ({size_kb:.1f} KB) → root")
-                            else:
-                                print_warning("Dual-partition merge failed (non-critical)")
-                        else:
-                            print_warning("Python not found - skipping dual-partition merge")
-                    else:
-                        print_warning("Skipping dual-partition (bootloader or app binary missing)")
-                else:
-                    print_warning("Merge script not found (skipping dual-partition)")
-                
-                # Step 6: Copy node_app.bin to packages directory for OTA deployment
-                print_step(6, "Copying node app binary to packages")
-                if app_bin.exists():
-                    app_dest = packages_dir / "node_app_16.bin"
-                    shutil.copy2(app_bin, app_dest)
-                    size_kb = app_bin.stat().st_size / 1024
-                    print_success(f"node_app_16.bin → packages/ ({size_kb:.1f} KB)")
-                else:
-                    print_warning("node_app_16.bin not found - skipping packages copy")
+        jobs = args.jobs or ninja_jobs()
+        variant_args = (project_root, cmake, ninja, launcher)
+        # Load average is system-wide - cap it on the total budget, not a variant's share
+        variant_opts = (args.verbose, args.dual_only, jobs)
+        
+        if build_both:
+            # Variants use disjoint build directories - build them side by side,
+            # splitting the CPU budget so the two ninja instances don't oversubscribe
+            jobs = max(1, jobs // len(hw_versions))
+            print(f"{Colors.CYAN}Building {' and '.join(hw_versions)} in parallel ({jobs} jobs each)...{Colors.RESET}")
+            with ProcessPoolExecutor(max_workers=len(hw_versions)) as pool:
+                futures = [pool.submit(build_variant_logged, hw_version, *variant_args, jobs, *variant_opts)
+                           for hw_version in hw_versions]
+                results = [future.result() for future in futures]
             
-            else:
-                # V1: Create dual-partition firmware for all 12 nodes
-                print_step(5, "Creating V1 dual-partition firmware")
-                
-                merge_script = project_root / "build_tools" / "merge_dual_partition.py"
-                if not merge_script.exists():
-                    print_warning("Merge script not found - skipping dual-partition")
-                    continue
-                
-                python = shutil.which("python3") or shutil.which("python") or shutil.which("py")
-                if not python:
-                    print_warning("Python not found - skipping dual-partition")
-                    continue
-                
-                bootloader_uf2 = build_dir / "bootloader" / "bootloader_12.uf2"
-                if not bootloader_uf2.exists():
-                    print_warning("Bootloader not found - skipping dual-partition")
-                    continue
-                
-                # Prepend headers and merge for each node
-                header_script = project_root / "build_tools" / "prepend_app_header.py"
-                for node_id in range(12):
-                    app_bin = build_dir / "node" / f"node_app_12_{node_id}.bin"
-                    if not app_bin.exists():
-                        print_warning(f"node_app_12_{node_id}.bin not found")
-                        continue
-                    
-                    # Prepend header
-                    app_with_header = build_dir / "node" / f"node_app_12_{node_id}_header.bin"
-                    if header_script.exists():
-                        header_cmd = [python, str(header_script), str(app_bin), str(app_with_header)]
-                        run_command(header_cmd, check=False)
-                    else:
-                        app_with_header = app_bin
-                    
-                    # Merge bootloader + app
-                    output_uf2 = hw_release_dir / f"node_dual_12_{node_id}.uf2"
-                    merge_cmd = [python, str(merge_script), str(bootloader_uf2), 
-                                str(app_with_header), str(output_uf2)]
-                    
-                    if run_command(merge_cmd, check=False):
-                        copied_count += 1
-                
-                if copied_count > 0:
-                    print_success(f"node_dual_12_0.uf2 through node_dual_12_11.uf2 (12 files) → root")
+            # Replay logs in variant order so output stays readable
+            errors = []
+            manifests = {}
+            for hw_version, (log, error, manifest) in zip(hw_versions, results):
+                print(log, end="")
+                manifests[hw_version] = manifest
+                if error:
+                    errors.append(error)
+            if errors:
+                raise RuntimeError("; ".join(errors))
+        else:
+            manifests = {hw_versions[0]: build_variant(hw_versions[0], *variant_args, jobs, *variant_opts)}
 
         # Success!
         print_header("Build completed successfully!")
-        
-        print(f"\n{Colors.GREEN}Firmware ready:{Colors.RESET}")
-        for hw_v in hw_versions:
-            hw_subdir = "12node" if hw_v == "V1" else "16node"
-            hw_dir = release_dir / hw_subdir
-            if hw_dir.exists():
-                print(f"\n{Colors.CYAN}{hw_v} Hardware: {Colors.BOLD}FirmwareReleases/{hw_subdir}/{Colors.RESET}")
-                for file in sorted(hw_dir.iterdir()):
-                    if file.is_file():
-                        size_kb = file.stat().st_size / 1024
-                        print(f"  {file.name} ({size_kb:.1f} KB)")
-        
-        # Show packages directory if node_app.bin was copied
-        if (packages_dir / "node_app_16.bin").exists():
-            print(f"\n{Colors.CYAN}OTA Package: {Colors.BOLD}packages/node_app_16.bin{Colors.RESET}")
-            size_kb = (packages_dir / "node_app_16.bin").stat().st_size / 1024
-            print(f"  node_app_16.bin ({size_kb:.1f} KB) - Ready for OTA deployment")
+        print_report(manifests)
 
     except Exception as e:
         print_header("Build FAILED!")
@@ -398,8 +641,53 @@ def main():
         traceback.print_exc()
         sys.exit(1)
 
-    finally:
-        os.chdir(original_dir)
+def print_report(manifests):
+    """Summarise the files each variant produced (from its manifest - no directory scan)"""
+    print(f"\n{Colors.GREEN}Firmware ready:{Colors.RESET}")
+    package_files = []
+    for hw_v, manifest in manifests.items():
+        hw_subdir = CONFIGS[hw_v].release_subdir
+        hw_prefix = f"FirmwareReleases/{hw_subdir}/"
+        root_files = [(path, size) for path, size in manifest if path.startswith(hw_prefix) and "/" not in path[len(hw_prefix):]]
+        apponly_files = [(path, size) for path, size in manifest if path.startswith(hw_prefix + "apponly/")]
+        package_files += [(path, size) for path, size in manifest if path.startswith("packages/")]
+        
+        print(f"\n{Colors.CYAN}{hw_v} Hardware: {Colors.BOLD}{hw_prefix}{Colors.RESET}")
+        
+        # Root directory files (most commonly used)
+        print(f"{Colors.CYAN}Root (commonly used):{Colors.RESET}")
+        for path, size in root_files:
+            name = path.rsplit("/", 1)[-1]
+            size_kb = size / 1024
+            if "dual" in name:
+                print(f"  {Colors.GREEN}{Colors.BOLD}{name}{Colors.RESET} ({size_kb:.1f} KB) {Colors.YELLOW}<-- FLASH THIS{Colors.RESET}")
+            else:
+                print(f"  {Colors.GREEN}{name}{Colors.RESET} ({size_kb:.1f} KB)")
+        
+        # apponly subdirectory (advanced/recovery)
+        if apponly_files:
+            print(f"\n{Colors.CYAN}apponly/ (advanced/recovery):{Colors.RESET}")
+            for path, size in apponly_files[:3]:  # Show first 3
+                print(f"  {path.rsplit('/', 1)[-1]} ({size / 1024:.1f} KB)")
+            if len(apponly_files) > 3:
+                print(f"  ... and {len(apponly_files) - 3} more files")
+    
+    # Show packages directory
+    print(f"\n{Colors.CYAN}OTA Packages: {Colors.BOLD}packages/{Colors.RESET}")
+    if package_files:
+        # Show first few and total count
+        for path, size in package_files[:3]:
+            print(f"  {path.rsplit('/', 1)[-1]} ({size / 1024:.1f} KB) - Ready for OTA deployment")
+        if len(package_files) > 3:
+            print(f"  ... and {len(package_files) - 3} more files")
+    else:
+        print(f"  (No package files found)")
+    
+    print(f"\n{Colors.CYAN}To flash:{Colors.RESET}")
+    if "V1" in manifests:
+        print(f"  V1: Drag node_dual_12_N.uf2 to BOOTSEL drive (N = node ID 0-11)")
+    if "V2" in manifests:
+        print(f"  V2: Drag node_dual_16.uf2 to BOOTSEL drive")
 
 if __name__ == "__main__":
     main()
@@ -23,30 +23,29 @@ def convert_elf_to_uf2(elf_path, uf2_path):
     block_size = 256
     num_blocks = (len(data) + block_size - 1) // block_size
     
+    # Build all blocks in one zero-filled buffer (padding comes for free), write once
+    header = struct.Struct('<IIIIIIII')
+    uf2 = bytearray(512 * num_blocks)
+    for i in range(num_blocks):
+        offset = i * block_size
+        chunk = data[offset:offset + block_size]  # Last chunk may be short - rest stays zero
+        
+        # UF2 block header
+        header.pack_into(uf2, 512 * i,
+            UF2_MAGIC_START0,
+            UF2_MAGIC_START1,
+            UF2_FLAG_FAMILY_ID_PRESENT,
+            base_addr + offset,
+            block_size,
+            i,
+            num_blocks,
+            RP2350_ARM_S_FAMILY_ID
+        )
+        uf2[512*i + 32 : 512*i + 32 + len(chunk)] = chunk
+        struct.pack_into('<I', uf2, 512*i + 508, UF2_MAGIC_END)
+    
     with open(uf2_path, 'wb') as f:
-        for i in range(num_blocks):
-            offset = i * block_size
-            chunk = data[offset:offset + block_size]
-            if len(chunk) < block_size:
-                chunk += b'\x00' * (block_size - len(chunk))
-            
-            # UF2 block header
-            block = struct.pack('<IIIIIIII',
-                UF2_MAGIC_START0,
-                UF2_MAGIC_START1,
-                UF2_FLAG_FAMILY_ID_PRESENT,
-                base_addr + offset,
-                block_size,
-                i,
-                num_blocks,
-                RP2350_ARM_S_FAMILY_ID
-            )
-            block += chunk
-            block += struct.pack('<I', UF2_MAGIC_END)
-            
-            # Pad to 512 bytes
-            block += b'\x00' * (512 - len(block))
-            f.write(block)
+        f.write(uf2)
     
     print(f"Converted {elf_path} to {uf2_path}")
     print(f"  Data size: {len(data)} bytes")
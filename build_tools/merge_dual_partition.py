@@ -8,7 +8,10 @@ Creates a UF2 file with two address ranges:
 """
 
 import sys
+import os
+import mmap
 import struct
+from contextlib import contextmanager
 from pathlib import Path
 
 UF2_MAGIC_START0 = 0x0A324655  # "UF2\n"
@@ -17,11 +20,18 @@ UF2_MAGIC_END = 0x0AB16F30
 UF2_FLAG_FAMILY_ID_PRESENT = 0x00002000
 RP2350_ARM_S_FAMILY_ID = 0xe48bff59
 
-def create_uf2_block(block_no, num_blocks, target_addr, data):
-    """Create a single UF2 block (512 bytes)"""
+UF2_BLOCK_SIZE = 512
+UF2_HEADER = struct.Struct('<IIIIIIII')
+UF2_END = struct.Struct('<I')
+
+# App partition: flash 0x00080000-0x007FFFFF (7.5MB)
+APP_MAX_SIZE = 0x00800000 - 0x00080000
+
+def pack_uf2_block(buf, offset, block_no, num_blocks, target_addr, data):
+    """Write a single UF2 block (512 bytes) into a zero-filled buffer at offset"""
     assert len(data) == 256, "Data must be 256 bytes"
     
-    block = struct.pack('<IIIIIIII',
+    UF2_HEADER.pack_into(buf, offset,
         UF2_MAGIC_START0,
         UF2_MAGIC_START1,
         UF2_FLAG_FAMILY_ID_PRESENT,
@@ -31,85 +41,106 @@ def create_uf2_block(block_no, num_blocks, target_addr, data):
         num_blocks,
         RP2350_ARM_S_FAMILY_ID
     )
-    block += data  # 32 bytes header + 256 bytes data = 288 bytes
-    
-    # Pad to 508 bytes, then add magic end (4 bytes) = 512 bytes total
-    padding_needed = 508 - len(block)
-    block += b'\x00' * padding_needed
-    block += struct.pack('<I', UF2_MAGIC_END)
+    buf[offset + 32:offset + 32 + 256] = data  # 32 bytes header + 256 bytes data
     
-    return block
+    # Bytes 288-507 stay zero (padding), magic end in the last 4 bytes
+    UF2_END.pack_into(buf, offset + 508, UF2_MAGIC_END)
+
+def create_uf2_block(block_no, num_blocks, target_addr, data):
+    """Create a single UF2 block (512 bytes)"""
+    block = bytearray(UF2_BLOCK_SIZE)
+    pack_uf2_block(block, 0, block_no, num_blocks, target_addr, data)
+    return bytes(block)
 
 def bin_to_uf2_blocks(bin_data, base_addr, start_block_no):
-    """Convert binary data to UF2 blocks"""
-    blocks = []
-    num_blocks = (len(bin_data) + 255) // 256
-    
-    for i in range(num_blocks):
-        chunk = bin_data[i*256 : (i+1)*256]
-        if len(chunk) < 256:
-            chunk += b'\x00' * (256 - len(chunk))  # Pad last block
-        
-        target_addr = base_addr + i * 256
-        blocks.append((start_block_no + i, target_addr, chunk))
-    
-    return blocks
+    """Yield (block_no, target_addr, 256-byte chunk) UF2 blocks for binary data
+
+    Full blocks are zero-copy memoryview slices; only the last partial block
+    is copied to pad it.
+    """
+    data = memoryview(bin_data)
+    num_full_blocks, tail = divmod(len(data), 256)
+    
+    for i in range(num_full_blocks):
+        yield start_block_no + i, base_addr + i * 256, data[i*256 : (i+1)*256]
+    
+    if tail:
+        chunk = bytes(data[num_full_blocks*256:]).ljust(256, b'\x00')  # Pad last block
+        yield start_block_no + num_full_blocks, base_addr + num_full_blocks * 256, chunk
+
+@contextmanager
+def map_binary(path):
+    """Read-only mmap of a binary file - pages are read on demand, not copied
+    onto the Python heap. Empty files (which can't be mapped) give b''."""
+    with open(path, 'rb') as f:
+        if f.seek(0, 2) == 0:
+            yield b''
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
 
 def merge_binaries_to_uf2(bootloader_uf2, app_bin, output_uf2):
     """Merge bootloader UF2 (with BS2) and app binary into single UF2"""
+    # Keep the mapping alive until the output has been written
+    with map_binary(app_bin) as app_data:
+        merge_app_image_to_uf2(bootloader_uf2, app_data, output_uf2)
+
+def merge_app_image_to_uf2(bootloader_uf2, app_data, output_uf2, verbose=True):
+    """Merge bootloader UF2 (with BS2) and in-memory app image into single UF2"""
+    log = print if verbose else (lambda *args: None)
+    
+    # Reject an oversized app before touching the bootloader or output
+    if len(app_data) > APP_MAX_SIZE:
+        raise ValueError(f"App image is {len(app_data)} bytes, partition holds {APP_MAX_SIZE}")
     
-    # Read bootloader UF2 blocks (includes BS2)
+    # Read bootloader UF2 blocks (includes BS2) in one go; payloads are
+    # zero-copy slices of the file contents
+    uf2_data = memoryview(Path(bootloader_uf2).read_bytes())
     bootloader_blocks = []
-    with open(bootloader_uf2, 'rb') as f:
-        while True:
-            chunk = f.read(512)
-            if len(chunk) < 512:
-                break
-            
-            magic1 = struct.unpack('<I', chunk[0:4])[0]
-            if magic1 == UF2_MAGIC_START0:
-                # UF2 format:
-                # 0-3: magic0, 4-7: magic1, 8-11: flags, 12-15: target_addr
-                # 16-19: payload_size, 20-23: block_no, 24-27: num_blocks, 28-31: family_id
-                # 32+: payload data
-                target_addr = struct.unpack('<I', chunk[12:16])[0]
-                payload_size = struct.unpack('<I', chunk[16:20])[0]
-                data = chunk[32:32+payload_size]
-                bootloader_blocks.append((target_addr, data))
-    
-    print(f"Bootloader: {len(bootloader_blocks)} UF2 blocks (includes BS2)")
-    
-    # Read app binary
-    app_data = Path(app_bin).read_bytes()
-    print(f"App:        {len(app_data)} bytes")
+    for offset in range(0, len(uf2_data) - UF2_BLOCK_SIZE + 1, UF2_BLOCK_SIZE):
+        # UF2 format:
+        # 0-3: magic0, 4-7: magic1, 8-11: flags, 12-15: target_addr
+        # 16-19: payload_size, 20-23: block_no, 24-27: num_blocks, 28-31: family_id
+        # 32+: payload data
+        magic0, _, _, target_addr, payload_size, _, _, _ = UF2_HEADER.unpack_from(uf2_data, offset)
+        if magic0 == UF2_MAGIC_START0:
+            data = uf2_data[offset + 32:offset + 32 + payload_size]
+            bootloader_blocks.append((target_addr, data))
+    
+    log(f"Bootloader: {len(bootloader_blocks)} UF2 blocks (includes BS2)")
+    log(f"App:        {len(app_data)} bytes")
     
     # Create blocks for app (XIP base 0x10080000 = flash offset 0x00080000)
     app_blocks = bin_to_uf2_blocks(app_data, 0x10080000, 0)
+    num_app_blocks = (len(app_data) + 255) // 256
     
     # Combine: bootloader blocks (with BS2) + app blocks
-    total_blocks = len(bootloader_blocks) + len(app_blocks)
+    total_blocks = len(bootloader_blocks) + num_app_blocks
+    
+    log(f"Total UF2 blocks: {total_blocks}")
+    log(f"  Bootloader: {len(bootloader_blocks)} blocks")
+    log(f"  App:        {num_app_blocks} blocks")
+    
+    # Build the whole UF2 image in one preallocated buffer, then write it once
+    uf2 = bytearray(UF2_BLOCK_SIZE * total_blocks)
     
-    print(f"Total UF2 blocks: {total_blocks}")
-    print(f"  Bootloader: {len(bootloader_blocks)} blocks")
-    print(f"  App:        {len(app_blocks)} blocks")
+    # Bootloader blocks (preserves BS2 and addresses)
+    for block_no, (target_addr, data) in enumerate(bootloader_blocks):
+        pack_uf2_block(uf2, block_no * UF2_BLOCK_SIZE, block_no, total_blocks, target_addr, data)
+    
+    # App blocks
+    for block_no, target_addr, data in app_blocks:
+        block_no += len(bootloader_blocks)
+        pack_uf2_block(uf2, block_no * UF2_BLOCK_SIZE, block_no, total_blocks, target_addr, data)
     
-    # Write UF2 file
     with open(output_uf2, 'wb') as f:
-        # Write bootloader blocks (preserves BS2 and addresses)
-        for block_no, (target_addr, data) in enumerate(bootloader_blocks):
-            uf2_block = create_uf2_block(block_no, total_blocks, target_addr, data)
-            f.write(uf2_block)
-        
-        # Write app blocks
-        for block_no, target_addr, data in app_blocks:
-            uf2_block = create_uf2_block(len(bootloader_blocks) + block_no, total_blocks, target_addr, data)
-            f.write(uf2_block)
-    
-    print(f"\nCreated: {output_uf2}")
-    print(f"Size: {Path(output_uf2).stat().st_size} bytes")
-    print("\nFlash layout:")
-    print("  0x00000000-0x0007FFFF (512KB): Bootloader")
-    print("  0x00080000-0x007FFFFF (7.5MB): Application")
+        f.write(uf2)
+    
+    log(f"\nCreated: {output_uf2}")
+    log(f"Size: {Path(output_uf2).stat().st_size} bytes")
+    log("\nFlash layout:")
+    log("  0x00000000-0x0007FFFF (512KB): Bootloader")
+    log("  0x00080000-0x007FFFFF (7.5MB): Application")
 
 def main():
     if len(sys.argv) != 4:
@@ -120,15 +151,21 @@ def main():
     app_bin = sys.argv[2]
     output_uf2 = sys.argv[3]
     
-    # Check inputs exist
-    if not Path(bootloader_bin).exists():
+    # Check inputs exist (one stat each, which also sizes the app)
+    if not os.path.isfile(bootloader_bin):
         print(f"ERROR: Bootloader not found: {bootloader_bin}")
         sys.exit(1)
     
-    if not Path(app_bin).exists():
+    try:
+        app_size = os.path.getsize(app_bin)
+    except FileNotFoundError:
         print(f"ERROR: App not found: {app_bin}")
         sys.exit(1)
     
+    if app_size > APP_MAX_SIZE:
+        print(f"ERROR: App is {app_size} bytes, larger than the {APP_MAX_SIZE} byte app partition")
+        sys.exit(1)
+    
     merge_binaries_to_uf2(bootloader_bin, app_bin, output_uf2)
 
 if __name__ == '__main__':
@@ -6,47 +6,29 @@ Creates a 192-byte header with magic, version, CRC32, etc.
 Header format matches app_header_t in bootloader_main.c
 """
 
+import os
 import sys
+import mmap
 import struct
-from pathlib import Path
-
-# CRC32 lookup table (IEEE 802.3 polynomial 0xEDB88320)
-CRC32_TABLE = None
-
-def init_crc32_table():
-    """Initialize CRC32 lookup table (matches bootloader implementation)"""
-    global CRC32_TABLE
-    if CRC32_TABLE is not None:
-        return
-    
-    CRC32_TABLE = []
-    for i in range(256):
-        crc = i
-        for j in range(8):
-            if crc & 1:
-                crc = (crc >> 1) ^ 0xEDB88320
-            else:
-                crc >>= 1
-        CRC32_TABLE.append(crc)
+import binascii
 
 def calculate_crc32(data):
-    """Calculate CRC32 (same algorithm as bootloader)"""
-    init_crc32_table()
-    
-    crc = 0xFFFFFFFF
-    for byte in data:
-        crc = (crc >> 8) ^ CRC32_TABLE[(crc ^ byte) & 0xFF]
-    
-    return (~crc) & 0xFFFFFFFF
+    """Calculate CRC32 (same algorithm as bootloader)
+
+    IEEE 802.3 polynomial (reflected 0xEDB88320), init and final XOR 0xFFFFFFFF -
+    identical to the bootloader's table-driven version, computed by zlib in C.
+    """
+    return binascii.crc32(data) & 0xFFFFFFFF
 
-def create_app_header(binary_data, name="Z1 Node App", version=(1, 0, 0)):
-    """Create 192-byte app header"""
+def create_app_header(binary_data, name="Z1 Node App", version=(1, 0, 0), crc32=None):
+    """Create 192-byte app header (pass crc32 if already known for binary_data)"""
     
     magic = 0x5A314150  # "Z1AP"
     version_major, version_minor, version_patch = version
     flags = 0
     binary_size = len(binary_data)
-    crc32 = calculate_crc32(binary_data)
+    if crc32 is None:
+        crc32 = calculate_crc32(binary_data)
     entry_point = 0xC0  # Standard RP2350 entry point
     
     # Pack header (192 bytes total)
@@ -62,18 +44,14 @@ def create_app_header(binary_data, name="Z1 Node App", version=(1, 0, 0)):
     )
     
     # Add name (32 bytes, null-terminated)
-    name_bytes = name.encode('utf-8')[:31] + b'\x00'
-    name_bytes += b'\x00' * (32 - len(name_bytes))
-    header += name_bytes
+    header += name.encode('utf-8')[:31].ljust(32, b'\x00')
     
     # Add description (64 bytes, null-terminated)
     description = "Full node firmware - runs on top of bootloader"
-    desc_bytes = description.encode('utf-8')[:63] + b'\x00'
-    desc_bytes += b'\x00' * (64 - len(desc_bytes))
-    header += desc_bytes
+    header += description.encode('utf-8')[:63].ljust(64, b'\x00')
     
     # Add reserved (64 bytes)
-    header += b'\x00' * 64
+    header = header.ljust(192, b'\x00')
     
     assert len(header) == 192, f"Header must be 192 bytes, got {len(header)}"
     
@@ -82,8 +60,17 @@ def create_app_header(binary_data, name="Z1 Node App", version=(1, 0, 0)):
 def prepend_header(input_bin, output_bin, name="Z1 Node App", version=(1, 0, 0)):
     """Prepend header to binary file"""
     
-    # Read input binary
-    binary_data = Path(input_bin).read_bytes()
+    # Map the input rather than reading it onto the heap - it's only hashed
+    # and then written straight back out after the header
+    with open(input_bin, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            write_with_header(b'', output_bin, name, version)
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as binary_data:
+                write_with_header(binary_data, output_bin, name, version)
+
+def write_with_header(binary_data, output_bin, name, version):
+    """Write header + binary_data to output_bin, reporting the header fields"""
     print(f"Input binary: {len(binary_data)} bytes")
     
     # Create header
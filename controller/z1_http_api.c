@@ -320,6 +320,7 @@ void handle_root(char* response, int size) {
         "                <div class=\"api-item\"><span class=\"method-post\">POST</span> /api/snn/stop - Stop SNN</div>\n"
         "                <div class=\"api-item\"><span class=\"method-get\">GET</span> /api/snn/status - Get SNN status</div>\n"
         "                <div class=\"api-item\"><span class=\"method-post\">POST</span> /api/snn/input - Inject spikes</div>\n"
+        "                <div class=\"api-item\"><span class=\"method-get\">GET</span> /api/snn/inject/status - Spike injection progress</div>\n"
         "                <div class=\"api-item\"><span class=\"method-post\">POST</span> /api/snn/reset - Reset SNN</div>\n"
         "                <hr style=\"border-color: rgba(255,255,255,0.1); margin: 15px 0;\">\n"
         "                <div class=\"api-item\"><span class=\"method-get\">GET</span> /api/files - List files</div>\n"
@@ -1678,6 +1679,33 @@ void handle_snn_input(const char* body, char* response, int size) {
     snprintf(response, size, "{\"status\":\"queued\",\"jobs\":%lu,\"spikes\":%lu}", jobs_queued, total_spikes);
 }
 
+/**
+ * GET /api/snn/inject/status - Background spike injection progress
+ * 
+ * Lets clients detect completion of a queued /api/snn/input request
+ * instead of guessing from the 100 spikes/sec rate.
+ * 
+ * Response: {"pending": N, "injected": M, "jobs": J}
+ *   pending  - spikes queued but not yet sent (0 when idle)
+ *   injected - total spikes sent since boot
+ *   jobs     - jobs still in the queue (including the active one)
+ */
+void handle_snn_inject_status(char* response, int size) {
+    uint32_t pending = 0;
+    for (uint8_t i = 0; i < spike_queue.count; i++) {
+        uint8_t idx = (spike_queue.head + i) % MAX_SPIKE_JOBS;
+        // Active job at head: only its unsent spikes are pending
+        if (i == 0 && spike_queue.current_remaining > 0) {
+            pending += spike_queue.current_remaining;
+        } else {
+            pending += spike_queue.jobs[idx].count;
+        }
+    }
+    
+    snprintf(response, size, "{\"pending\":%lu,\"injected\":%lu,\"jobs\":%u}",
+             pending, spike_queue.total_injected, spike_queue.count);
+}
+
 /**
  * Background spike injection processor
  * Called from Core 0 main loop to process queued spike jobs asynchronously
@@ -2780,6 +2808,12 @@ int z1_http_api_route(const char* method, const char* path, const char* body,
         return 200;
     }
     
+    // GET /api/snn/inject/status - Spike injection progress
+    if (strcmp(method, "GET") == 0 && strcmp(path, "/api/snn/inject/status") == 0) {
+        handle_snn_inject_status(response, size);
+        return 200;
+    }
+    
     // POST /api/nodes/{id}/memory
     if (strcmp(method, "POST") == 0 && strstr(path, "/memory") != NULL) {
         printf("[HTTP API] Matched /memory route\n");
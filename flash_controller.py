@@ -8,6 +8,9 @@ import sys
 import os
 import subprocess
 import shutil
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import argparse
 
@@ -18,6 +21,7 @@ RED = '\033[91m'
 CYAN = '\033[96m'
 RESET = '\033[0m'
 
+@functools.lru_cache(maxsize=None)
 def find_picotool():
     """Find picotool in PATH or build_tools"""
     # Check build_tools first
@@ -33,6 +37,7 @@ def find_picotool():
     
     return None
 
+@functools.lru_cache(maxsize=None)
 def find_firmware(hw_version):
     """Find controller firmware file for specified hardware version"""
     project_root = Path(__file__).parent
@@ -46,10 +51,78 @@ def find_firmware(hw_version):
     
     return firmware_file if firmware_file.exists() else None
 
+def wait_for_bootsel(picotool, device, timeout=5.0):
+    """Poll picotool until the device enumerates in BOOTSEL mode; True if it did
+
+    Enumeration usually takes well under a second, so this returns far sooner
+    than a fixed sleep would.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if subprocess.run([picotool, "info"] + device, capture_output=True, timeout=1).returncode == 0:
+                return True
+        except subprocess.TimeoutExpired:
+            pass
+        time.sleep(0.1)
+    return False
+
+def flash_one(picotool, firmware_file, serial=None):
+    """Reboot one device to BOOTSEL and load firmware_file; returns True on success
+
+    serial selects the device (picotool --ser) when several are connected.
+    """
+    tag = f"[{serial}] " if serial else ""
+    device = ["--ser", serial] if serial else []
+    
+    # Step 1: Reboot to BOOTSEL
+    print(f"{CYAN}{tag}Step 1: Rebooting device to BOOTSEL mode...{RESET}")
+    try:
+        result = subprocess.run([picotool, "reboot", "-f", "-u"] + device, 
+                              capture_output=True, text=True, timeout=10)
+        if result.returncode != 0:
+            print(f"{YELLOW}{tag}[WARN] Device may already be in BOOTSEL mode{RESET}")
+    except subprocess.TimeoutExpired:
+        print(f"{YELLOW}{tag}[WARN] Reboot command timed out (device may already be in BOOTSEL){RESET}")
+    except Exception as e:
+        print(f"{YELLOW}{tag}[WARN] Could not reboot device: {e}{RESET}")
+        if not serial:
+            print(f"{YELLOW}Please manually enter BOOTSEL mode (hold BOOTSEL button, connect USB){RESET}")
+            input(f"\nPress Enter when device is in BOOTSEL mode...")
+    
+    # Wait for device to enumerate in BOOTSEL mode
+    print(f"{CYAN}{tag}Waiting for device to enter BOOTSEL mode...{RESET}")
+    if not wait_for_bootsel(picotool, device):
+        print(f"{YELLOW}{tag}[WARN] Device not detected in BOOTSEL mode yet - trying to load anyway{RESET}")
+    
+    # Step 2: Load firmware
+    print(f"{CYAN}{tag}Step 2: Loading {firmware_file.name}...{RESET}")
+    try:
+        result = subprocess.run([picotool, "load", str(firmware_file), "-x"] + device, 
+                              capture_output=True, text=True, timeout=30)
+        if result.returncode != 0:
+            print(f"{RED}{tag}[ERROR] Failed to load firmware:{RESET}")
+            print(result.stderr)
+            return False
+        print(f"{GREEN}{tag}[OK] Firmware flashed and running{RESET}")
+        return True
+        
+    except subprocess.TimeoutExpired:
+        print(f"{RED}{tag}[ERROR] Flash operation timed out{RESET}")
+        return False
+    except Exception as e:
+        print(f"{RED}{tag}[ERROR] Failed to flash firmware: {e}{RESET}")
+        return False
+
+def comma_list(value):
+    """argparse type for comma-separated values"""
+    return [item.strip() for item in value.split(',') if item.strip()]
+
 def main():
     parser = argparse.ArgumentParser(description='Flash Z1 Onyx controller firmware via USB')
     parser.add_argument('--hw-v1', action='store_true', help='Use V1 hardware (12 nodes)')
     parser.add_argument('--hw-v2', action='store_true', help='Use V2 hardware (16 nodes)')
+    parser.add_argument('--ser', type=comma_list, help='Serial number(s) of the controller(s) to flash, comma-separated - flashed in parallel')
     args = parser.parse_args()
     
     # Default to V2 if not specified
@@ -81,51 +154,29 @@ def main():
         if args.hw_v1:
             print(f"\nRun: python build.py --hw-v1\n")
         else:
-            print(f"\nRun: python build.py (or python build_dual.py for OTA support)\n")
+            print(f"\nRun: python build.py\n")
         return 1
     
     print(f"{GREEN}[OK] Firmware: {firmware_file.relative_to(Path(__file__).parent)}{RESET}\n")
     
-    # Step 1: Reboot to BOOTSEL
-    print(f"{CYAN}Step 1: Rebooting device to BOOTSEL mode...{RESET}")
-    try:
-        result = subprocess.run([picotool, "reboot", "-f", "-u"], 
-                              capture_output=True, text=True, timeout=10)
-        if result.returncode != 0:
-            print(f"{YELLOW}[WARN] Device may already be in BOOTSEL mode{RESET}")
-    except subprocess.TimeoutExpired:
-        print(f"{YELLOW}[WARN] Reboot command timed out (device may already be in BOOTSEL){RESET}")
-    except Exception as e:
-        print(f"{YELLOW}[WARN] Could not reboot device: {e}{RESET}")
-        print(f"{YELLOW}Please manually enter BOOTSEL mode (hold BOOTSEL button, connect USB){RESET}")
-        input(f"\nPress Enter when device is in BOOTSEL mode...")
-    
-    # Wait for device to enumerate in BOOTSEL mode
-    import time
-    print(f"{CYAN}Waiting for device to enter BOOTSEL mode...{RESET}")
-    time.sleep(3)
+    # Several controllers are independent USB channels - flash them concurrently
+    serials = args.ser or [None]
+    if len(serials) > 1:
+        with ThreadPoolExecutor(max_workers=len(serials)) as pool:
+            results = list(pool.map(lambda serial: flash_one(picotool, firmware_file, serial), serials))
+    else:
+        results = [flash_one(picotool, firmware_file, serials[0])]
     
-    # Step 2: Load firmware
-    print(f"\n{CYAN}Step 2: Loading firmware...{RESET}")
-    try:
-        result = subprocess.run([picotool, "load", str(firmware_file), "-x"], 
-                              capture_output=True, text=True, timeout=30)
-        if result.returncode != 0:
-            print(f"{RED}[ERROR] Failed to load firmware:{RESET}")
-            print(result.stderr)
-            return 1
-        
-        print(f"\n{GREEN}{'='*60}{RESET}")
-        print(f"{GREEN}SUCCESS! Controller firmware flashed and running.{RESET}")
-        print(f"{GREEN}{'='*60}{RESET}\n")
-        return 0
-        
-    except subprocess.TimeoutExpired:
-        print(f"{RED}[ERROR] Flash operation timed out{RESET}")
-        return 1
-    except Exception as e:
-        print(f"{RED}[ERROR] Failed to flash firmware: {e}{RESET}")
+    if not all(results):
+        if len(serials) > 1:
+            failed = [serial for serial, ok in zip(serials, results) if not ok]
+            print(f"\n{RED}[ERROR] Failed to flash: {', '.join(failed)}{RESET}")
         return 1
+    
+    print(f"\n{GREEN}{'='*60}{RESET}")
+    print(f"{GREEN}SUCCESS! Controller firmware flashed and running.{RESET}")
+    print(f"{GREEN}{'='*60}{RESET}\n")
+    return 0
 
 if __name__ == "__main__":
     sys.exit(main())
@@ -8,6 +8,9 @@ import sys
 import os
 import subprocess
 import shutil
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import argparse
 
@@ -18,6 +21,7 @@ RED = '\033[91m'
 CYAN = '\033[96m'
 RESET = '\033[0m'
 
+@functools.lru_cache(maxsize=None)
 def find_picotool():
     """Find picotool in PATH or build_tools"""
     # Check build_tools first
@@ -33,6 +37,15 @@ def find_picotool():
     
     return None
 
+@functools.lru_cache(maxsize=None)
+def list_firmware(firmware_dir):
+    """Names of the files in firmware_dir, from one scandir (empty if it is missing)"""
+    try:
+        with os.scandir(firmware_dir) as entries:
+            return frozenset(e.name for e in entries if e.is_file())
+    except FileNotFoundError:
+        return frozenset()
+
 def find_firmware(hw_version):
     """Find node firmware file for specified hardware version"""
     project_root = Path(__file__).parent
@@ -44,28 +57,95 @@ def find_firmware(hw_version):
     else:
         # V1: Show all available node firmwares
         firmware_dir = project_root / "FirmwareReleases" / "12node"
+        present = list_firmware(firmware_dir)
         print(f"\n{YELLOW}V1 hardware uses per-node firmware files:{RESET}")
         for i in range(12):
-            fw = firmware_dir / f"node_dual_12_{i}.uf2"
-            if fw.exists():
+            if f"node_dual_12_{i}.uf2" in present:
                 print(f"  - node_dual_12_{i}.uf2 (for Node {i})")
         print(f"\n{CYAN}Please specify which node firmware to flash with --node <id>{RESET}")
         return None
     
-    return firmware_file if firmware_file.exists() else None
+    return firmware_file if firmware_file.name in list_firmware(firmware_dir) else None
+
+def wait_for_bootsel(picotool, device, timeout=5.0):
+    """Poll picotool until the device enumerates in BOOTSEL mode; True if it did
+
+    Enumeration usually takes well under a second, so this returns far sooner
+    than a fixed sleep would.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if subprocess.run([picotool, "info"] + device, capture_output=True, timeout=1).returncode == 0:
+                return True
+        except subprocess.TimeoutExpired:
+            pass
+        time.sleep(0.1)
+    return False
+
+def flash_one(picotool, firmware_file, serial=None):
+    """Reboot one device to BOOTSEL and load firmware_file; returns True on success
+
+    serial selects the device (picotool --ser) when several are connected.
+    """
+    tag = f"[{serial}] " if serial else ""
+    device = ["--ser", serial] if serial else []
+    
+    # Step 1: Reboot to BOOTSEL
+    print(f"{CYAN}{tag}Step 1: Rebooting device to BOOTSEL mode...{RESET}")
+    try:
+        result = subprocess.run([picotool, "reboot", "-f", "-u"] + device, 
+                              capture_output=True, text=True, timeout=10)
+        if result.returncode != 0:
+            print(f"{YELLOW}{tag}[WARN] Device may already be in BOOTSEL mode{RESET}")
+    except subprocess.TimeoutExpired:
+        print(f"{YELLOW}{tag}[WARN] Reboot command timed out (device may already be in BOOTSEL){RESET}")
+    except Exception as e:
+        print(f"{YELLOW}{tag}[WARN] Could not reboot device: {e}{RESET}")
+        if not serial:
+            print(f"{YELLOW}Please manually enter BOOTSEL mode (hold BOOTSEL button, connect USB){RESET}")
+            input(f"\nPress Enter when device is in BOOTSEL mode...")
+    
+    # Wait for device to enumerate in BOOTSEL mode
+    print(f"{CYAN}{tag}Waiting for device to enter BOOTSEL mode...{RESET}")
+    if not wait_for_bootsel(picotool, device):
+        print(f"{YELLOW}{tag}[WARN] Device not detected in BOOTSEL mode yet - trying to load anyway{RESET}")
+    
+    # Step 2: Load firmware
+    print(f"{CYAN}{tag}Step 2: Loading {firmware_file.name}...{RESET}")
+    try:
+        result = subprocess.run([picotool, "load", str(firmware_file), "-x"] + device, 
+                              capture_output=True, text=True, timeout=30)
+        if result.returncode != 0:
+            print(f"{RED}{tag}[ERROR] Failed to load firmware:{RESET}")
+            print(result.stderr)
+            return False
+        print(f"{GREEN}{tag}[OK] Firmware flashed and running{RESET}")
+        return True
+        
+    except subprocess.TimeoutExpired:
+        print(f"{RED}{tag}[ERROR] Flash operation timed out{RESET}")
+        return False
+    except Exception as e:
+        print(f"{RED}{tag}[ERROR] Failed to flash firmware: {e}{RESET}")
+        return False
+
+def comma_list(value):
+    """argparse type for comma-separated values"""
+    return [item.strip() for item in value.split(',') if item.strip()]
 
 def main():
     parser = argparse.ArgumentParser(description='Flash Z1 Onyx node firmware via USB')
     parser.add_argument('--hw-v1', action='store_true', help='Use V1 hardware (12 nodes)')
     parser.add_argument('--hw-v2', action='store_true', help='Use V2 hardware (16 nodes)')
-    parser.add_argument('--node', type=int, help='Node ID (0-11 for V1)')
+    parser.add_argument('--node', type=comma_list, help='Node ID (0-11 for V1); comma-separated, one per --ser device')
+    parser.add_argument('--ser', type=comma_list, help='Serial number(s) of the device(s) to flash, comma-separated - flashed in parallel')
     args = parser.parse_args()
     
     # Default to V2 if not specified
     if not args.hw_v1 and not args.hw_v2:
         args.hw_v2 = True
     
-    hw_version = "v1" if args.hw_v1 else "v2"
     hw_label = "V1 (12-node)" if args.hw_v1 else "V2 (16-node)"
     
     print(f"\n{CYAN}{'='*60}{RESET}")
@@ -83,73 +163,65 @@ def main():
     
     print(f"{GREEN}[OK] Found picotool: {picotool}{RESET}")
     
-    # Find firmware
+    # Pair each device with its firmware (no --ser: the single connected device)
+    serials = args.ser or [None]
     if args.hw_v1:
         if args.node is None:
             find_firmware("v1")  # Shows available files
             return 1
         
-        if args.node < 0 or args.node > 11:
-            print(f"{RED}[ERROR] Node ID must be 0-11 for V1 hardware{RESET}")
+        if len(args.node) != len(serials):
+            print(f"{RED}[ERROR] Give one --node ID per --ser device{RESET}")
             return 1
         
         project_root = Path(__file__).parent
         firmware_dir = project_root / "FirmwareReleases" / "12node"
-        firmware_file = firmware_dir / f"node_dual_12_{args.node}.uf2"
-        
-        if not firmware_file.exists():
-            print(f"{RED}[ERROR] Firmware not found: {firmware_file}{RESET}")
-            print(f"\nRun: python build.py --hw-v1\n")
-            return 1
+        jobs = []
+        for serial, node in zip(serials, args.node):
+            if not node.isdigit() or int(node) > 11:
+                print(f"{RED}[ERROR] Node ID must be 0-11 for V1 hardware{RESET}")
+                return 1
+            
+            firmware_file = firmware_dir / f"node_dual_12_{int(node)}.uf2"
+            if firmware_file.name not in list_firmware(firmware_dir):
+                print(f"{RED}[ERROR] Firmware not found: {firmware_file}{RESET}")
+                print(f"\nRun: python build.py --hw-v1\n")
+                return 1
+            jobs.append((serial, firmware_file))
     else:
         firmware_file = find_firmware("v2")
         if not firmware_file:
             print(f"{RED}[ERROR] Firmware not found{RESET}")
-            print(f"\nRun: python build_dual.py\n")
+            print(f"\nRun: python build.py --dual-only\n")
             return 1
+        jobs = [(serial, firmware_file) for serial in serials]
     
-    print(f"{GREEN}[OK] Firmware: {firmware_file.relative_to(Path(__file__).parent)}{RESET}\n")
+    for serial, firmware_file in jobs:
+        target = f" → {serial}" if serial else ""
+        print(f"{GREEN}[OK] Firmware: {firmware_file.relative_to(Path(__file__).parent)}{target}{RESET}")
+    print()
     
-    # Step 1: Reboot to BOOTSEL
-    print(f"{CYAN}Step 1: Rebooting device to BOOTSEL mode...{RESET}")
-    try:
-        result = subprocess.run([picotool, "reboot", "-f", "-u"], 
-                              capture_output=True, text=True, timeout=10)
-        if result.returncode != 0:
-            print(f"{YELLOW}[WARN] Device may already be in BOOTSEL mode{RESET}")
-    except subprocess.TimeoutExpired:
-        print(f"{YELLOW}[WARN] Reboot command timed out (device may already be in BOOTSEL){RESET}")
-    except Exception as e:
-        print(f"{YELLOW}[WARN] Could not reboot device: {e}{RESET}")
-        print(f"{YELLOW}Please manually enter BOOTSEL mode (hold BOOTSEL button, connect USB){RESET}")
-        input(f"\nPress Enter when device is in BOOTSEL mode...")
+    # Each device is its own USB channel and the work is waiting on picotool,
+    # so flash every device at once rather than capping at the CPU count
+    if len(jobs) > 1:
+        with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            results = list(pool.map(lambda job: flash_one(picotool, job[1], job[0]), jobs))
+    else:
+        results = [flash_one(picotool, jobs[0][1], jobs[0][0])]
     
-    # Wait for device to enumerate in BOOTSEL mode
-    import time
-    print(f"{CYAN}Waiting for device to enter BOOTSEL mode...{RESET}")
-    time.sleep(3)
+    if not all(results):
+        if len(jobs) > 1:
+            failed = [serial for (serial, _), ok in zip(jobs, results) if not ok]
+            print(f"\n{RED}[ERROR] Failed to flash: {', '.join(failed)}{RESET}")
+        return 1
     
-    # Step 2: Load firmware
-    print(f"\n{CYAN}Step 2: Loading firmware...{RESET}")
-    try:
-        result = subprocess.run([picotool, "load", str(firmware_file), "-x"], 
-                              capture_output=True, text=True, timeout=30)
-        if result.returncode != 0:
-            print(f"{RED}[ERROR] Failed to load firmware:{RESET}")
-            print(result.stderr)
-            return 1
-        
-        print(f"\n{GREEN}{'='*60}{RESET}")
+    print(f"\n{GREEN}{'='*60}{RESET}")
+    if len(jobs) > 1:
+        print(f"{GREEN}SUCCESS! Node firmware flashed and running on {len(jobs)} devices.{RESET}")
+    else:
         print(f"{GREEN}SUCCESS! Node firmware flashed and running.{RESET}")
-        print(f"{GREEN}{'='*60}{RESET}\n")
-        return 0
-        
-    except subprocess.TimeoutExpired:
-        print(f"{RED}[ERROR] Flash operation timed out{RESET}")
-        return 1
-    except Exception as e:
-        print(f"{RED}[ERROR] Failed to flash firmware: {e}{RESET}")
-        return 1
+    print(f"{GREEN}{'='*60}{RESET}\n")
+    return 0
 
 if __name__ == "__main__":
     sys.exit(main())
@@ -5,13 +5,18 @@ Tests the full workflow: discover, deploy, inject, monitor, stop
 """
 
 import sys
-import os
-import subprocess
-import tempfile
+import io
 import time
 import json
+import re
 import argparse
+import functools
+import importlib.machinery
+import importlib.util
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 
 # Get script directory for relative path resolution
@@ -32,33 +37,118 @@ WAIT = '[SKIP]'
 # Global verbose flag
 VERBOSE = True
 
-def run_command(cmd, description):
-    """Run a command and return output"""
+# "<node> online ..." rows in nls table output
+NODE_RE = re.compile(r'^[ \t]*\d+[ \t]+online(?!\S)', re.MULTILINE)
+
+# One HTTP session for the direct API checks - reuses the controller connection
+SESSION = requests.Session()
+
+@functools.lru_cache(maxsize=None)
+def load_tool(name):
+    """Import a python_tools/bin script (no .py suffix) as a module, once"""
+    loader = importlib.machinery.SourceFileLoader(name, str(SCRIPT_DIR / name))
+    spec = importlib.util.spec_from_loader(name, loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+class ThreadCapture(io.TextIOBase):
+    """sys.stdout/sys.stderr stand-in that sends writes to a per-thread buffer when one is set
+
+    contextlib.redirect_stdout swaps the process-wide stream, so it cannot
+    separate the output of tools running concurrently on a thread pool.
+    """
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, s):
+        buffer = getattr(self.local, 'buffer', None)
+        return (self.stream if buffer is None else buffer).write(s)
+
+    def flush(self):
+        self.stream.flush()
+
+@contextmanager
+def thread_capture():
+    """Install ThreadCapture on sys.stdout/sys.stderr for the duration (no-op if already installed)"""
+    if isinstance(sys.stdout, ThreadCapture):
+        yield
+        return
+    previous = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = ThreadCapture(sys.stdout), ThreadCapture(sys.stderr)
+    try:
+        yield
+    finally:
+        sys.stdout, sys.stderr = previous
+
+@contextmanager
+def stdin_from(text):
+    """Feed text to an in-process tool reading sys.stdin"""
+    previous, sys.stdin = sys.stdin, io.StringIO(text)
+    try:
+        yield
+    finally:
+        sys.stdin = previous
+
+@contextmanager
+def captured(stdout, stderr):
+    """Route this thread's stdout/stderr writes into the given buffers (inside thread_capture)"""
+    previous = getattr(sys.stdout.local, 'buffer', None), getattr(sys.stderr.local, 'buffer', None)
+    sys.stdout.local.buffer, sys.stderr.local.buffer = stdout, stderr
+    try:
+        yield
+    finally:
+        sys.stdout.local.buffer, sys.stderr.local.buffer = previous
+
+def run_tool(name, args, description):
+    """Run a python_tools/bin tool's main() in-process and return (success, stdout, stderr)
+
+    Avoids starting a fresh interpreter (and re-importing requests) per test.
+    """
     print(f"{YELLOW}Running: {description}...{RESET}")
+    stdout, stderr = io.StringIO(), io.StringIO()
     try:
-        # Run command from project root for consistent path resolution
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30, cwd=PROJECT_ROOT)
-        return result.returncode == 0, result.stdout, result.stderr
-    except subprocess.TimeoutExpired:
-        return False, "", "Command timed out"
+        with thread_capture(), captured(stdout, stderr):
+            returncode = load_tool(name).main(args)
+    except SystemExit as e:  # argparse usage errors
+        returncode = e.code
     except Exception as e:
-        return False, "", str(e)
+        return False, stdout.getvalue(), str(e)
+    return returncode in (0, None), stdout.getvalue(), stderr.getvalue()
+
+def run_concurrently(tests):
+    """Run independent read-only tests on a thread pool
+
+    tests is a list of (name, func, *args). Each test's console output is
+    buffered and printed afterwards, so the log and the returned
+    (name, success, detail) list keep the order given.
+    """
+    def run(test):
+        name, func, *func_args = test
+        output = io.StringIO()
+        with captured(output, output):
+            success, detail = func(*func_args)
+        return name, success, detail, output.getvalue()
+
+    with thread_capture(), ThreadPoolExecutor(max_workers=len(tests)) as pool:
+        outcomes = list(pool.map(run, tests))
+
+    results = []
+    for name, success, detail, output in outcomes:
+        print(output, end='')
+        results.append((name, success, detail))
+    return results
 
 def test_nls(controller_ip):
     """Test 1: Node discovery"""
-    cmd = ["python", "python_tools/bin/nls", "-c", controller_ip]
-    success, stdout, stderr = run_command(cmd, "Node discovery (nls)")
+    success, stdout, stderr = run_tool("nls", ["-c", controller_ip], "Node discovery (nls)")
     
     if not success:
         return False, "Failed to run nls"
     
     # Parse node count
-    lines = stdout.strip().split('\n')
-    node_count = 0
-    for line in lines:
-        parts = line.split()
-        if len(parts) >= 2 and parts[0].isdigit() and parts[1] == 'online':
-            node_count += 1
+    node_count = sum(1 for _ in NODE_RE.finditer(stdout))
     
     if node_count < 2:
         return False, f"Only {node_count} nodes found"
@@ -72,8 +162,7 @@ def test_nls(controller_ip):
 
 def test_deploy(controller_ip, topology):
     """Test 2: Topology deployment"""
-    cmd = ["python", "python_tools/bin/nsnn", "deploy", topology, "-c", controller_ip]
-    success, stdout, stderr = run_command(cmd, "Deploy topology (nsnn deploy)")
+    success, stdout, stderr = run_tool("nsnn", ["deploy", topology, "-c", controller_ip], "Deploy topology (nsnn deploy)")
     
     if not success:
         print(f"DEBUG: Deploy failed - stdout: {stdout[:200]}, stderr: {stderr[:200]}")
@@ -88,8 +177,7 @@ def test_deploy(controller_ip, topology):
 
 def test_nstat(controller_ip):
     """Test 3: Node status check"""
-    cmd = ["python", "python_tools/bin/nstat", "-c", controller_ip]
-    success, stdout, stderr = run_command(cmd, "Node status (nstat)")
+    success, stdout, stderr = run_tool("nstat", ["-c", controller_ip], "Node status (nstat)")
     
     if not success:
         return False, "Status check failed"
@@ -98,8 +186,7 @@ def test_nstat(controller_ip):
 
 def test_snn_start(controller_ip):
     """Test 4: Start SNN"""
-    cmd = ["python", "python_tools/bin/nsnn", "start", "-c", controller_ip]
-    success, stdout, stderr = run_command(cmd, "Start SNN (nsnn start)")
+    success, stdout, stderr = run_tool("nsnn", ["start", "-c", controller_ip], "Start SNN (nsnn start)")
     
     if not success:
         return False, "Failed to start SNN"
@@ -116,62 +203,55 @@ def test_inject_spikes(controller_ip, spike_count):
         ]
     }
     
-    # Write to temp file
-    fd, pattern_file = tempfile.mkstemp(suffix='.json', text=True)
-    try:
-        with os.fdopen(fd, 'w') as f:
-            json.dump(spike_pattern, f)
-        
-        cmd = ["python", "python_tools/bin/nsnn", "inject", pattern_file, "-c", controller_ip]
-        success, stdout, stderr = run_command(cmd, f"Queue {spike_count} spikes (nsnn inject)")
-        
-        if not success:
-            print(f"DEBUG: Inject failed - stdout: {stdout[:300]}, stderr: {stderr[:300]}")
-            return False, "Injection failed"
-        
-        if VERBOSE:
-            print(f"\n{BLUE}=== Spike Injection (Async) ==={RESET}")
-            print(stdout)
-            print(f"{BLUE}{'='*70}{RESET}\n")
-        
-        # Spikes queued - calculate expected completion time
-        # At 100 spikes/sec, time = spike_count / 100
-        expected_time = (spike_count / 100) + 1  # Add 1 sec buffer
-        print(f"{YELLOW}Spikes queued for background injection (rate: 100/sec, est. time: {expected_time:.1f}s){RESET}")
-        print(f"{YELLOW}Polling status every 2 seconds...{RESET}")
-        
-        # Poll status until complete
-        start_time = time.time()
-        max_wait = expected_time + 5  # Add 5 sec timeout buffer
-        
-        while (time.time() - start_time) < max_wait:
-            # Query controller status
-            try:
-                resp = requests.get(f"http://{controller_ip}/api/nodes", timeout=5)
-                if resp.status_code == 200:
-                    data = resp.json()
-                    # Check if spike injection is complete (no pending jobs)
-                    # For now, just wait expected time
-                    elapsed = time.time() - start_time
-                    if elapsed >= expected_time:
-                        print(f"{GREEN}Spike injection complete ({elapsed:.1f}s){RESET}")
-                        break
-                    else:
-                        remaining = expected_time - elapsed
-                        print(f"  Progress: {elapsed:.1f}s / {expected_time:.1f}s (est. {remaining:.1f}s remaining)")
-            except Exception as e:
-                print(f"  Status poll failed: {e}")
-            
-            time.sleep(2)
+    # Hand the pattern to nsnn on stdin ('-') - no temp file needed
+    with stdin_from(json.dumps(spike_pattern)):
+        success, stdout, stderr = run_tool("nsnn", ["inject", "-", "-c", controller_ip], f"Queue {spike_count} spikes (nsnn inject)")
+    
+    if not success:
+        print(f"DEBUG: Inject failed - stdout: {stdout[:300]}, stderr: {stderr[:300]}")
+        return False, "Injection failed"
+    
+    if VERBOSE:
+        print(f"\n{BLUE}=== Spike Injection (Async) ==={RESET}")
+        print(stdout)
+        print(f"{BLUE}{'='*70}{RESET}\n")
+    
+    # Spikes queued - at 100 spikes/sec, time = spike_count / 100
+    expected_time = (spike_count / 100) + 1  # Add 1 sec buffer
+    print(f"{YELLOW}Spikes queued for background injection (rate: 100/sec, est. time: {expected_time:.1f}s){RESET}")
+    
+    # Poll the controller until its injection queue drains. Backoff starts
+    # at 50 ms so short injections are detected almost immediately.
+    start_time = time.time()
+    max_wait = expected_time + 5  # Add 5 sec timeout buffer
+    last_report = start_time
+    i = 0
+    
+    while (time.time() - start_time) < max_wait:
+        try:
+            resp = SESSION.get(f"http://{controller_ip}/api/snn/inject/status", timeout=5)
+            if resp.status_code == 200:
+                status = resp.json()
+                elapsed = time.time() - start_time
+                if status.get('pending', 0) == 0:
+                    print(f"{GREEN}Spike injection complete ({elapsed:.1f}s, {status.get('injected', 0)} total injected){RESET}")
+                    break
+                if time.time() - last_report >= 2:
+                    print(f"  Progress: {elapsed:.1f}s, {status['pending']} spikes pending")
+                    last_report = time.time()
+        except Exception as e:
+            print(f"  Status poll failed: {e}")
         
-        return True, f"{spike_count} spikes"
-    finally:
-        os.unlink(pattern_file)
+        time.sleep(min(0.5, 0.05 * 1.5**i))
+        i += 1
+    else:
+        return False, f"Injection not complete after {max_wait:.1f}s"
+    
+    return True, f"{spike_count} spikes"
 
 def test_snn_stats(controller_ip):
     """Test 6: Get SNN statistics"""
-    cmd = ["python", "python_tools/bin/nstat", "-c", controller_ip, "-s"]
-    success, stdout, stderr = run_command(cmd, "SNN statistics (nstat -s)")
+    success, stdout, stderr = run_tool("nstat", ["-c", controller_ip, "-s"], "SNN statistics (nstat -s)")
     
     if not success:
         return False, "Stats not available"
@@ -189,8 +269,7 @@ def test_snn_stats(controller_ip):
 
 def test_monitor(controller_ip, duration_ms):
     """Test 7: Monitor spike activity"""
-    cmd = ["python", "python_tools/bin/nsnn", "monitor", str(duration_ms), "-c", controller_ip]
-    success, stdout, stderr = run_command(cmd, f"Monitor spikes ({duration_ms}ms)")
+    success, stdout, stderr = run_tool("nsnn", ["monitor", str(duration_ms), "-c", controller_ip], f"Monitor spikes ({duration_ms}ms)")
     
     if not success:
         return False, "Monitor failed"
@@ -204,8 +283,7 @@ def test_monitor(controller_ip, duration_ms):
 
 def test_snn_status(controller_ip):
     """Test 8: Get SNN status"""
-    cmd = ["python", "python_tools/bin/nsnn", "status", "-c", controller_ip]
-    success, stdout, stderr = run_command(cmd, "SNN status (nsnn status)")
+    success, stdout, stderr = run_tool("nsnn", ["status", "-c", controller_ip], "SNN status (nsnn status)")
     
     if not success:
         return False, "Status failed"
@@ -214,8 +292,7 @@ def test_snn_status(controller_ip):
 
 def test_snn_stop(controller_ip):
     """Test 9: Stop SNN"""
-    cmd = ["python", "python_tools/bin/nsnn", "stop", "-c", controller_ip]
-    success, stdout, stderr = run_command(cmd, "Stop SNN (nsnn stop)")
+    success, stdout, stderr = run_tool("nsnn", ["stop", "-c", controller_ip], "Stop SNN (nsnn stop)")
     
     if not success:
         return False, "Failed to stop"
@@ -225,7 +302,7 @@ def test_snn_stop(controller_ip):
 def test_sd_card(controller_ip):
     """Test 10: SD Card Status (Optional)"""
     try:
-        response = requests.get(f"http://{controller_ip}/api/sd/status", timeout=2)
+        response = SESSION.get(f"http://{controller_ip}/api/sd/status", timeout=2)
         if response.status_code != 200:
             return True, "Not available (SKIP)"
         
@@ -278,18 +355,14 @@ def main():
         print(f"{CROSS} ABORT - Cannot deploy topology\n")
         sys.exit(1)
     
-    # Test 3: Node status
-    success, detail = test_nstat(args.controller)
-    results.append(("nstat", success, detail))
-    
-    # Test 4: Start SNN
+    # Test 3: Start SNN
     success, detail = test_snn_start(args.controller)
     results.append(("nsnn start", success, detail))
     if not success:
         print(f"{CROSS} ABORT - Cannot start SNN\n")
         sys.exit(1)
     
-    # Test 5: Inject spikes
+    # Test 4: Inject spikes
     success, detail = test_inject_spikes(args.controller, args.spikes)
     results.append(("nsnn inject", success, detail))
     
@@ -297,22 +370,19 @@ def main():
     print(f"Waiting 100ms for spike propagation...")
     time.sleep(0.1)
     
-    # Test 6: SNN status (while running)
-    success, detail = test_snn_status(args.controller)
-    results.append(("nsnn status", success, detail))
+    # Tests 5-8: Read-only checks while the SNN is running - independent of
+    # each other, so they run concurrently
+    results.extend(run_concurrently([
+        ("nstat", test_nstat, args.controller),
+        ("nsnn status", test_snn_status, args.controller),
+        ("nstat -s", test_snn_stats, args.controller),
+        ("SD card", test_sd_card, args.controller),
+    ]))
     
-    # Test 7: Get statistics WHILE SNN is still running
-    success, detail = test_snn_stats(args.controller)
-    results.append(("nstat -s", success, detail))
-    
-    # Test 8: Stop SNN AFTER collecting stats
+    # Test 9: Stop SNN AFTER collecting stats
     success, detail = test_snn_stop(args.controller)
     results.append(("nsnn stop", success, detail))
     
-    # Test 9: SD Card (Optional)
-    success, detail = test_sd_card(args.controller)
-    results.append(("SD card", success, detail))
-    
     # Print summary
     print(f"\n{BLUE}=== Test Summary ==={RESET}\n")
     passed = 0
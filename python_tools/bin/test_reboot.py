@@ -10,6 +10,9 @@ import time
 
 CONTROLLER_IP = "192.168.1.201"
 
+# One HTTP session - the reboot call reuses the config check's connection
+SESSION = requests.Session()
+
 def test_reboot_endpoint():
     """Test that reboot endpoint exists and responds correctly"""
     print("Testing POST /api/system/reboot endpoint...")
@@ -18,7 +21,7 @@ def test_reboot_endpoint():
         url = f"http://{CONTROLLER_IP}/api/system/reboot"
         print(f"  Sending POST to {url}...")
         
-        response = requests.post(url, timeout=3)
+        response = SESSION.post(url, timeout=3)
         
         print(f"  HTTP Status: {response.status_code}")
         print(f"  Response: {response.text}")
@@ -55,7 +58,7 @@ def test_config_before_reboot():
     print("\nTesting GET /api/config (pre-reboot)...")
     
     try:
-        response = requests.get(f"http://{CONTROLLER_IP}/api/config", timeout=2)
+        response = SESSION.get(f"http://{CONTROLLER_IP}/api/config", timeout=2)
         
         if response.status_code == 200:
             config = response.json()
@@ -14,9 +14,14 @@ Usage:
 """
 
 import sys
+import io
+import random
+import time
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from requests.adapters import HTTPAdapter
 
 # ANSI colors
 GREEN = '\033[92m'
@@ -30,146 +35,193 @@ CHECK = '[OK]'
 CROSS = '[FAIL]'
 SKIP = '[SKIP]'
 
-def test_sd_status(controller_ip):
+# Statuses worth retrying - the controller is busy or restarting its server
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class UnrecoverableError(Exception):
+    """Client error (4xx other than 429) - retrying would get the same answer"""
+
+def request_with_retry(session, method, url, *, max_retries=3, base=1.0, cap=30.0, **kwargs):
+    """session.request() with exponential backoff + jitter on transient failures
+
+    Connection errors, timeouts and RETRY_STATUSES are retried up to
+    max_retries times; after that the last response is returned (or the
+    last exception raised). Other 4xx responses raise UnrecoverableError
+    straight away. The happy path makes exactly one request.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            r = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == max_retries:
+                raise
+        else:
+            if 400 <= r.status_code < 500 and r.status_code != 429:
+                raise UnrecoverableError(f"HTTP {r.status_code}: {r.text}")
+            if r.status_code not in RETRY_STATUSES or attempt == max_retries:
+                return r
+        time.sleep(min(cap, base * 2**attempt) * (1 + random.uniform(0, 0.5)))
+
+def test_sd_status(session, controller_ip, out):
     """Test 1: Check SD card status"""
-    print(f"\n{BLUE}Test 1: SD Card Status{RESET}")
+    print(f"\n{BLUE}Test 1: SD Card Status{RESET}", file=out)
     try:
-        r = requests.get(f"http://{controller_ip}/api/sd/status", timeout=5)
+        r = request_with_retry(session, "GET", f"http://{controller_ip}/api/sd/status", timeout=5)
         if r.status_code == 200:
             data = r.json()
             if data.get("mounted"):
                 free_mb = data.get("free_mb", 0)
-                print(f"{GREEN}{CHECK} SD card mounted, {free_mb} MB free{RESET}")
+                print(f"{GREEN}{CHECK} SD card mounted, {free_mb} MB free{RESET}", file=out)
                 return True
             else:
                 error = data.get("error", "Unknown error")
-                print(f"{YELLOW}{SKIP} SD card not mounted: {error}{RESET}")
+                print(f"{YELLOW}{SKIP} SD card not mounted: {error}{RESET}", file=out)
                 return False
         else:
-            print(f"{RED}{CROSS} HTTP {r.status_code}: {r.text}{RESET}")
+            print(f"{RED}{CROSS} HTTP {r.status_code}: {r.text}{RESET}", file=out)
             return False
     except Exception as e:
-        print(f"{RED}{CROSS} Request failed: {e}{RESET}")
+        print(f"{RED}{CROSS} Request failed: {e}{RESET}", file=out)
         return False
 
-def test_config_read(controller_ip):
+def test_config_read(session, controller_ip, out):
     """Test 2: Read configuration"""
-    print(f"\n{BLUE}Test 2: Read Configuration{RESET}")
+    print(f"\n{BLUE}Test 2: Read Configuration{RESET}", file=out)
     try:
-        r = requests.get(f"http://{controller_ip}/api/config", timeout=5)
+        r = request_with_retry(session, "GET", f"http://{controller_ip}/api/config", timeout=5)
         if r.status_code == 200:
             data = r.json()
             ip = data.get("ip_address", "unknown")
             engine = data.get("current_engine", "unknown")
-            print(f"{GREEN}{CHECK} Config: IP={ip}, Engine={engine}{RESET}")
+            print(f"{GREEN}{CHECK} Config: IP={ip}, Engine={engine}{RESET}", file=out)
             return True
         else:
-            print(f"{RED}{CROSS} HTTP {r.status_code}: {r.text}{RESET}")
+            print(f"{RED}{CROSS} HTTP {r.status_code}: {r.text}{RESET}", file=out)
             return False
     except Exception as e:
-        print(f"{RED}{CROSS} Request failed: {e}{RESET}")
+        print(f"{RED}{CROSS} Request failed: {e}{RESET}", file=out)
         return False
 
-def test_config_write(controller_ip):
+def test_config_write(session, controller_ip, out):
     """Test 3: Write configuration"""
-    print(f"\n{BLUE}Test 3: Update Configuration{RESET}")
+    print(f"\n{BLUE}Test 3: Update Configuration{RESET}", file=out)
     try:
         config = {"current_engine": "test_engine"}
-        r = requests.post(f"http://{controller_ip}/api/config", 
-                         json=config, timeout=5)
+        r = request_with_retry(session, "POST", f"http://{controller_ip}/api/config",
+                               json=config, timeout=5)
         if r.status_code == 200:
             data = r.json()
             if data.get("success"):
-                print(f"{GREEN}{CHECK} Config updated successfully{RESET}")
+                print(f"{GREEN}{CHECK} Config updated successfully{RESET}", file=out)
                 
                 # Verify by reading back
-                r2 = requests.get(f"http://{controller_ip}/api/config", timeout=5)
+                r2 = request_with_retry(session, "GET", f"http://{controller_ip}/api/config", timeout=5)
                 if r2.status_code == 200:
                     data2 = r2.json()
                     if data2.get("current_engine") == "test_engine":
-                        print(f"{GREEN}{CHECK} Config verified: engine=test_engine{RESET}")
+                        print(f"{GREEN}{CHECK} Config verified: engine=test_engine{RESET}", file=out)
                         return True
-                print(f"{YELLOW}{SKIP} Config not verified{RESET}")
+                print(f"{YELLOW}{SKIP} Config not verified{RESET}", file=out)
                 return False
         else:
-            print(f"{RED}{CROSS} HTTP {r.status_code}: {r.text}{RESET}")
+            print(f"{RED}{CROSS} HTTP {r.status_code}: {r.text}{RESET}", file=out)
             return False
     except Exception as e:
-        print(f"{RED}{CROSS} Request failed: {e}{RESET}")
+        print(f"{RED}{CROSS} Request failed: {e}{RESET}", file=out)
         return False
 
-def test_file_upload(controller_ip):
+def test_file_upload(session, controller_ip, out):
     """Test 4: Upload file"""
-    print(f"\n{BLUE}Test 4: Upload File{RESET}")
+    print(f"\n{BLUE}Test 4: Upload File{RESET}", file=out)
     try:
         test_data = b"Hello Z1 Onyx!\nTest file from Python.\n" * 10
-        r = requests.put(f"http://{controller_ip}/api/files/engines/test.txt",
-                        data=test_data, timeout=5)
+        r = request_with_retry(session, "PUT", f"http://{controller_ip}/api/files/engines/test.txt",
+                               data=test_data, timeout=5)
         if r.status_code == 200:
             data = r.json()
             if data.get("success"):
                 size = data.get("size", 0)
-                print(f"{GREEN}{CHECK} Uploaded test.txt ({size} bytes){RESET}")
+                print(f"{GREEN}{CHECK} Uploaded test.txt ({size} bytes){RESET}", file=out)
                 return True
         else:
-            print(f"{RED}{CROSS} HTTP {r.status_code}: {r.text}{RESET}")
+            print(f"{RED}{CROSS} HTTP {r.status_code}: {r.text}{RESET}", file=out)
             return False
     except Exception as e:
-        print(f"{RED}{CROSS} Request failed: {e}{RESET}")
+        print(f"{RED}{CROSS} Request failed: {e}{RESET}", file=out)
         return False
 
-def test_file_list(controller_ip):
+def test_file_list(session, controller_ip, out):
     """Test 5: List directory"""
-    print(f"\n{BLUE}Test 5: List Files{RESET}")
+    print(f"\n{BLUE}Test 5: List Files{RESET}", file=out)
     try:
-        r = requests.get(f"http://{controller_ip}/api/files/engines", timeout=5)
+        r = request_with_retry(session, "GET", f"http://{controller_ip}/api/files/engines", timeout=5)
         if r.status_code == 200:
             data = r.json()
             files = data.get("files", [])
             count = data.get("count", 0)
-            print(f"{GREEN}{CHECK} Found {count} files in engines/:{RESET}")
+            print(f"{GREEN}{CHECK} Found {count} files in engines/:{RESET}", file=out)
             for f in files[:5]:  # Show first 5
                 name = f.get("name", "?")
                 size = f.get("size", 0)
-                print(f"  - {name} ({size} bytes)")
+                print(f"  - {name} ({size} bytes)", file=out)
             if count > 5:
-                print(f"  ... and {count - 5} more")
+                print(f"  ... and {count - 5} more", file=out)
             return True
         else:
-            print(f"{RED}{CROSS} HTTP {r.status_code}: {r.text}{RESET}")
+            print(f"{RED}{CROSS} HTTP {r.status_code}: {r.text}{RESET}", file=out)
             return False
     except Exception as e:
-        print(f"{RED}{CROSS} Request failed: {e}{RESET}")
+        print(f"{RED}{CROSS} Request failed: {e}{RESET}", file=out)
         return False
 
-def test_file_delete(controller_ip):
+def test_file_delete(session, controller_ip, out):
     """Test 6: Delete file"""
-    print(f"\n{BLUE}Test 6: Delete File{RESET}")
+    print(f"\n{BLUE}Test 6: Delete File{RESET}", file=out)
     try:
-        r = requests.delete(f"http://{controller_ip}/api/files/engines/test.txt",
-                           timeout=5)
+        r = request_with_retry(session, "DELETE", f"http://{controller_ip}/api/files/engines/test.txt",
+                               timeout=5)
         if r.status_code == 200:
             data = r.json()
             if data.get("success"):
-                print(f"{GREEN}{CHECK} Deleted test.txt{RESET}")
+                print(f"{GREEN}{CHECK} Deleted test.txt{RESET}", file=out)
                 
                 # Verify by listing
-                r2 = requests.get(f"http://{controller_ip}/api/files/engines", timeout=5)
+                r2 = request_with_retry(session, "GET", f"http://{controller_ip}/api/files/engines", timeout=5)
                 if r2.status_code == 200:
                     data2 = r2.json()
                     files = data2.get("files", [])
                     if not any(f.get("name") == "test.txt" for f in files):
-                        print(f"{GREEN}{CHECK} File deleted verified{RESET}")
+                        print(f"{GREEN}{CHECK} File deleted verified{RESET}", file=out)
                         return True
-                print(f"{YELLOW}{SKIP} Delete not verified{RESET}")
+                print(f"{YELLOW}{SKIP} Delete not verified{RESET}", file=out)
                 return False
         else:
-            print(f"{RED}{CROSS} HTTP {r.status_code}: {r.text}{RESET}")
+            print(f"{RED}{CROSS} HTTP {r.status_code}: {r.text}{RESET}", file=out)
             return False
     except Exception as e:
-        print(f"{RED}{CROSS} Request failed: {e}{RESET}")
+        print(f"{RED}{CROSS} Request failed: {e}{RESET}", file=out)
         return False
 
+def run_concurrently(session, controller_ip, tests):
+    """Run independent (name, test_func) tests on a thread pool
+
+    Each test writes its report into its own buffer, printed afterwards in
+    the order given. Returns {name: passed}.
+    """
+    def run(test):
+        name, test_func = test
+        output = io.StringIO()
+        return name, test_func(session, controller_ip, output), output.getvalue()
+    
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        outcomes = list(pool.map(run, tests))
+    
+    results = {}
+    for name, passed, output in outcomes:
+        print(output, end='')
+        results[name] = passed
+    return results
+
 def main():
     print(f"\n{BLUE}{'='*60}{RESET}")
     print(f"{BLUE}Z1 Onyx - SD Card API Test{RESET}")
@@ -178,22 +230,31 @@ def main():
     controller_ip = sys.argv[1] if len(sys.argv) > 1 else "192.168.1.201"
     print(f"Controller IP: {controller_ip}\n")
     
-    tests = [
+    # Read-only checks - no ordering dependency, so they run concurrently
+    read_only = [
         ("SD Status", test_sd_status),
         ("Config Read", test_config_read),
+        ("File List", test_file_list),
+    ]
+    # Each of these depends on the one before (write/upload -> delete)
+    sequential = [
         ("Config Write", test_config_write),
         ("File Upload", test_file_upload),
-        ("File List", test_file_list),
         ("File Delete", test_file_delete),
     ]
     
+    # One keep-alive session for every request - the controller's connection
+    # setup costs more than most of these calls
+    session = requests.Session()
+    session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=8))
+    
     results = {}
-    for name, test_func in tests:
-        try:
-            results[name] = test_func(controller_ip)
-        except KeyboardInterrupt:
-            print(f"\n{YELLOW}Test interrupted by user{RESET}")
-            break
+    try:
+        results.update(run_concurrently(session, controller_ip, read_only))
+        for name, test_func in sequential:
+            results[name] = test_func(session, controller_ip, sys.stdout)
+    except KeyboardInterrupt:
+        print(f"\n{YELLOW}Test interrupted by user{RESET}")
     
     # Summary
     print(f"\n{BLUE}{'='*60}{RESET}")
@@ -5,14 +5,55 @@ Flask-based REST API compatible with real Z1 hardware.
 """
 
 import base64
+import hashlib
 import json
+import os
 import struct
-from flask import Flask, request, jsonify
+import threading
+from flask import Flask, Response, request
 from typing import Optional
+from werkzeug.exceptions import BadRequest
+from werkzeug.serving import WSGIRequestHandler
+
+try:
+    import orjson  # Optional - several times faster than the json module
+except ImportError:
+    orjson = None
 
 from cluster import Cluster
 from snn_engine import ClusterSNNCoordinator, Spike
 
+# POSTed config patches arriving within this window are applied together
+CONFIG_DEBOUNCE_S = 0.02
+
+
+def dumps(obj, sort_keys: bool = False) -> bytes:
+    """Serialize obj to JSON bytes (orjson when installed)."""
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+    return json.dumps(obj, sort_keys=sort_keys).encode()
+
+
+def json_response(obj, status: int = 200) -> Response:
+    """JSON response built with dumps() - used in place of flask.jsonify."""
+    return Response(dumps(obj), status=status, mimetype='application/json')
+
+
+def json_body():
+    """Parsed JSON request body, or None if empty (400 if malformed)."""
+    data = request.get_data(cache=True)
+    if not data:
+        return None
+    try:
+        return orjson.loads(data) if orjson else json.loads(data)
+    except ValueError:
+        raise BadRequest('Malformed JSON body')
+
+
+class KeepAliveRequestHandler(WSGIRequestHandler):
+    """Werkzeug dev-server handler that speaks HTTP/1.1 so connections are kept alive."""
+    protocol_version = 'HTTP/1.1'
+
 
 class Z1APIServer:
     """HTTP API server for Z1 emulator."""
@@ -37,6 +78,26 @@ class Z1APIServer:
         # Current SNN topology
         self.current_topology: Optional[dict] = None
         
+        # Total spikes accepted by /api/snn/input
+        self.spikes_injected = 0
+        
+        # Serialized body + ETag of rarely-changing GET responses, by name;
+        # entries are dropped whenever the underlying object changes
+        # (guarded by _config_lock, like the config it caches)
+        self._json_cache = {}
+        
+        # Per-process ETag prefix, so tags from an earlier run never match
+        self._etag_prefix = os.urandom(4).hex()
+        
+        # Debounced /api/emulator/config writes: patches merge into
+        # _config_pending and _flush_config applies them in one update.
+        # _config_lock also covers _json_cache, so an entry is never built
+        # from an object that is being changed or has just been invalidated
+        self._config_pending = {}
+        self._config_version = 0
+        self._config_timer: Optional[threading.Timer] = None
+        self._config_lock = threading.Lock()
+        
         # Setup routes
         self._setup_routes()
     
@@ -47,119 +108,146 @@ class Z1APIServer:
         @self.app.route('/api/nodes', methods=['GET'])
         def get_nodes():
             """Get all nodes."""
-            nodes = []
-            for backplane_id, backplane in self.cluster.backplanes.items():
-                for node in backplane.nodes.values():
-                    info = node.get_info()
-                    info['backplane_id'] = backplane_id
-                    nodes.append(info)
-            return jsonify({'nodes': nodes})
+            return json_response({'nodes': self.cluster.get_nodes_info()})
         
         @self.app.route('/api/nodes/<int:node_id>', methods=['GET'])
         def get_node(node_id):
             """Get specific node (assumes backplane 0)."""
             node = self.cluster.get_node(0, node_id)
             if not node:
-                return jsonify({'error': 'Node not found'}), 404
-            return jsonify(node.get_info())
+                return json_response({'error': 'Node not found'}, 404)
+            return json_response(node.get_info())
         
         @self.app.route('/api/nodes/<int:node_id>/reset', methods=['POST'])
         def reset_node(node_id):
             """Reset specific node."""
             node = self.cluster.get_node(0, node_id)
             if not node:
-                return jsonify({'error': 'Node not found'}), 404
+                return json_response({'error': 'Node not found'}, 404)
             node.reset()
-            return jsonify({'status': 'ok', 'node_id': node_id})
+            # Its neuron table is gone - rebuild the engine on next start
+            self.snn_coordinator.unregister_engine(0, node_id)
+            return json_response({'status': 'ok', 'node_id': node_id})
         
         @self.app.route('/api/nodes/<int:node_id>/memory', methods=['GET'])
         def read_memory(node_id):
-            """Read node memory."""
+            """Read node memory (base64 in JSON - deprecated, use /memory/raw)."""
             addr = int(request.args.get('addr', 0))
             length = int(request.args.get('length', 256))
             
             node = self.cluster.get_node(0, node_id)
             if not node:
-                return jsonify({'error': 'Node not found'}), 404
+                return json_response({'error': 'Node not found'}, 404)
             
             try:
                 data = node.read_memory(addr, length)
-                return jsonify({
+                return json_response({
                     'addr': addr,
                     'length': len(data),
                     'data': base64.b64encode(data).decode('ascii')
                 })
             except Exception as e:
-                return jsonify({'error': str(e)}), 400
+                return json_response({'error': str(e)}, 400)
+        
+        @self.app.route('/api/nodes/<int:node_id>/memory/raw', methods=['GET'])
+        def read_memory_raw(node_id):
+            """Read node memory as raw bytes (addr/length echoed in X- headers)."""
+            addr = int(request.args.get('addr', 0))
+            length = int(request.args.get('length', 256))
+            
+            node = self.cluster.get_node(0, node_id)
+            if not node:
+                return json_response({'error': 'Node not found'}, 404)
+            
+            try:
+                data = node.read_memory(addr, length)
+                return Response(data, mimetype='application/octet-stream',
+                                headers={'X-Addr': str(addr), 'X-Length': str(len(data))})
+            except Exception as e:
+                return json_response({'error': str(e)}, 400)
         
         @self.app.route('/api/nodes/<int:node_id>/memory', methods=['POST'])
         def write_memory(node_id):
-            """Write node memory."""
-            data = request.json
-            addr = data.get('addr', 0)
-            data_b64 = data.get('data', '')
+            """
+            Write node memory.
             
+            Body is either JSON {"addr": N, "data": "<base64>"} or, with
+            Content-Type application/octet-stream, the raw bytes (addr in
+            the query string).
+            """
             node = self.cluster.get_node(0, node_id)
             if not node:
-                return jsonify({'error': 'Node not found'}), 404
+                return json_response({'error': 'Node not found'}, 404)
             
             try:
-                data_bytes = base64.b64decode(data_b64)
+                if request.mimetype == 'application/octet-stream':
+                    addr = int(request.args.get('addr', 0))
+                    data_bytes = request.get_data()
+                else:
+                    data = json_body()
+                    addr = data.get('addr', 0)
+                    data_bytes = base64.b64decode(data.get('data', ''))
                 bytes_written = node.write_memory(addr, data_bytes)
-                return jsonify({
+                if addr + bytes_written > node.memory.NEURON_TABLE_ADDR:
+                    # Possibly a new neuron table (nsnn deploy) - rebuild on next start
+                    self.snn_coordinator.unregister_engine(0, node_id)
+                return json_response({
                     'status': 'ok',
                     'bytes_written': bytes_written
                 })
             except Exception as e:
-                return jsonify({'error': str(e)}), 400
+                return json_response({'error': str(e)}, 400)
         
         @self.app.route('/api/nodes/<int:node_id>/firmware', methods=['GET'])
         def get_firmware_info(node_id):
             """Get firmware information."""
             node = self.cluster.get_node(0, node_id)
             if not node:
-                return jsonify({'error': 'Node not found'}), 404
+                return json_response({'error': 'Node not found'}, 404)
             
             if node.firmware_header:
-                return jsonify({
+                return json_response({
                     'name': node.firmware_header.name,
                     'version': node.firmware_header.version,
                     'size': node.firmware_header.firmware_size,
                     'build_timestamp': node.firmware_header.build_timestamp
                 })
             else:
-                return jsonify({'name': 'None', 'version': 0})
+                return json_response({'name': 'None', 'version': 0})
         
         @self.app.route('/api/nodes/<int:node_id>/firmware', methods=['POST'])
         def flash_firmware(node_id):
             """Flash firmware to node."""
-            data = request.json
+            data = json_body()
             firmware_b64 = data.get('firmware', '')
             
             node = self.cluster.get_node(0, node_id)
             if not node:
-                return jsonify({'error': 'Node not found'}), 404
+                return json_response({'error': 'Node not found'}, 404)
             
             try:
                 firmware_data = base64.b64decode(firmware_b64)
                 success = node.load_firmware(firmware_data)
                 if success:
-                    return jsonify({'status': 'ok', 'node_id': node_id})
+                    return json_response({'status': 'ok', 'node_id': node_id})
                 else:
-                    return jsonify({'error': 'Firmware load failed'}), 400
+                    return json_response({'error': 'Firmware load failed'}, 400)
             except Exception as e:
-                return jsonify({'error': str(e)}), 400
+                return json_response({'error': str(e)}, 400)
         
         # SNN management endpoints
         @self.app.route('/api/snn/deploy', methods=['POST'])
         def deploy_snn():
             """Deploy SNN topology."""
-            topology = request.json
-            self.current_topology = topology
+            topology = json_body()
+            with self._config_lock:
+                self.current_topology = topology
+                self._json_cache.pop('topology', None)
+            self._unregister_snn_engines()
             
             # This would normally be handled by nsnn tool
             # For emulator, we just store the topology
-            return jsonify({
+            return json_response({
                 'status': 'ok',
                 'message': 'Use nsnn tool to deploy topology'
             })
@@ -168,68 +256,80 @@ class Z1APIServer:
         def get_topology():
             """Get current SNN topology."""
             if self.current_topology:
-                return jsonify(self.current_topology)
+                return self._cached_json('topology', lambda: self.current_topology)
             else:
-                return jsonify({'error': 'No topology deployed'}), 404
+                return json_response({'error': 'No topology deployed'}, 404)
         
         @self.app.route('/api/snn/start', methods=['POST'])
         def start_snn():
             """Start SNN execution."""
-            timestep_us = request.json.get('timestep_us', 1000) if request.json else 1000
+            body = json_body()
+            timestep_us = body.get('timestep_us', 1000) if body else 1000
             
             # Initialize SNN engines from neuron tables in memory
             self._initialize_snn_engines()
             
             self.snn_coordinator.start_all(timestep_us)
-            return jsonify({'status': 'ok'})
+            return json_response({'status': 'ok'})
         
         @self.app.route('/api/snn/stop', methods=['POST'])
         def stop_snn():
             """Stop SNN execution."""
             self.snn_coordinator.stop_all()
-            return jsonify({'status': 'ok'})
+            return json_response({'status': 'ok'})
         
         @self.app.route('/api/snn/activity', methods=['GET'])
         def get_activity():
-            """Get SNN activity."""
-            activity = self.snn_coordinator.get_global_activity()
-            return jsonify(activity)
+            """Get SNN activity (304 if unchanged since the client's ETag)."""
+            # Read the sequence first: if activity moves on while the
+            # snapshot is built, the next poll still sees a new tag
+            etag = f'{self._etag_prefix}-{self.snn_coordinator.activity_seq}'
+            if request.if_none_match.contains(etag):
+                resp = Response(status=304)
+            else:
+                resp = json_response(self.snn_coordinator.get_global_activity())
+            resp.set_etag(etag)
+            return resp
         
         @self.app.route('/api/snn/events', methods=['GET'])
         def get_spike_events():
             """Get recent spike events."""
             count = int(request.args.get('count', 100))
             spikes = self.snn_coordinator.get_recent_spikes(count)
-            return jsonify({'spikes': spikes, 'count': len(spikes)})
+            return json_response({'spikes': spikes, 'count': len(spikes)})
         
         @self.app.route('/api/snn/input', methods=['POST'])
         def inject_spikes():
             """Inject input spikes."""
-            data = request.json
+            data = json_body()
             spikes_data = data.get('spikes', [])
             
-            injected = 0
-            for spike_data in spikes_data:
-                neuron_id = spike_data.get('neuron_id', 0)
-                value = spike_data.get('value', 1.0)
-                
-                # Inject into all engines (they will filter based on neuron ID)
-                for engine in self.snn_coordinator.engines.values():
-                    if neuron_id in engine.neurons:
-                        engine.inject_spike(neuron_id, value)
-                        injected += 1
-                        break
+            # One batch per engine holding the target neurons
+            injected = self.snn_coordinator.inject_spikes(
+                (spike_data.get('neuron_id', 0), spike_data.get('value', 1.0))
+                for spike_data in spikes_data
+            )
             
-            return jsonify({
+            self.spikes_injected += injected
+            return json_response({
                 'status': 'ok',
                 'spikes_injected': injected
             })
         
+        @self.app.route('/api/snn/inject/status', methods=['GET'])
+        def inject_status():
+            """Get spike injection progress (emulator injects synchronously)."""
+            return json_response({
+                'pending': 0,
+                'injected': self.spikes_injected,
+                'jobs': 0
+            })
+        
         # Emulator-specific endpoints
         @self.app.route('/api/emulator/status', methods=['GET'])
         def emulator_status():
             """Get emulator status (identifies as emulator)."""
-            return jsonify({
+            return json_response({
                 'emulator': True,
                 'version': '1.0.0',
                 'cluster_info': self.cluster.get_cluster_info()
@@ -239,22 +339,76 @@ class Z1APIServer:
         def reset_emulator():
             """Reset entire emulator."""
             self.cluster.reset_cluster()
-            self.snn_coordinator.stop_all()
-            return jsonify({'status': 'ok'})
+            self._unregister_snn_engines()
+            with self._config_lock:
+                self._json_cache.pop('config', None)
+            return json_response({'status': 'ok'})
         
         @self.app.route('/api/emulator/config', methods=['GET'])
         def get_config():
             """Get emulator configuration."""
-            return jsonify(self.cluster.config)
+            self._flush_config()  # Read-your-writes for pending patches
+            return self._cached_json('config', lambda: self.cluster.config)
         
         @self.app.route('/api/emulator/config', methods=['POST'])
         def set_config():
-            """Update emulator configuration."""
-            new_config = request.json
+            """
+            Update emulator configuration.
+            
+            Patches are debounced: bursts arriving within CONFIG_DEBOUNCE_S
+            are merged and applied as one update. Responds 202 with the
+            config version the patch will be part of.
+            """
+            new_config = json_body()
             # Update simulation parameters
-            if 'simulation' in new_config:
-                self.cluster.config['simulation'].update(new_config['simulation'])
-            return jsonify({'status': 'ok', 'config': self.cluster.config})
+            with self._config_lock:
+                if new_config and 'simulation' in new_config:
+                    self._config_pending.update(new_config['simulation'])
+                    self._config_version += 1
+                    if self._config_timer is None:
+                        self._config_timer = threading.Timer(CONFIG_DEBOUNCE_S, self._flush_config)
+                        self._config_timer.daemon = True
+                        self._config_timer.start()
+                version = self._config_version
+            return json_response({'status': 'accepted', 'version': version}, 202)
+    
+    def _flush_config(self):
+        """Apply all pending config patches at once (timer callback or before a read)."""
+        with self._config_lock:
+            if self._config_timer is not None:
+                self._config_timer.cancel()
+                self._config_timer = None
+            if not self._config_pending:
+                return
+            self.cluster.config.setdefault('simulation', {}).update(self._config_pending)
+            self._config_pending = {}
+            self._json_cache.pop('config', None)
+    
+    def _cached_json(self, key: str, get_obj) -> Response:
+        """
+        JSON response for a rarely-changing object, with ETag revalidation.
+        
+        The body and its ETag are built once per version of the object
+        returned by get_obj; a request whose If-None-Match carries that ETag
+        gets an empty 304 instead. get_obj is called and serialized under
+        _config_lock, so a concurrent update can neither change the object
+        mid-serialization nor be overwritten by a body built before it.
+        """
+        with self._config_lock:
+            cached = self._json_cache.get(key)
+            if cached is None:
+                body = dumps(get_obj(), sort_keys=True)
+                etag = hashlib.blake2b(body, digest_size=8).hexdigest()
+                cached = self._json_cache[key] = (body, etag)
+        body, etag = cached
+        
+        if request.if_none_match.contains(etag):
+            resp = Response(status=304)
+        else:
+            resp = Response(body, mimetype='application/json')
+        resp.set_etag(etag)
+        resp.headers['Cache-Control'] = 'private, max-age=1'
+        return resp
     
     def _initialize_snn_engines(self):
         """Initialize SNN engines from neuron tables in node memory."""
@@ -265,18 +419,21 @@ class Z1APIServer:
         
         for backplane_id, backplane in self.cluster.backplanes.items():
             for node_id, node in backplane.nodes.items():
+                # Existing engines are kept as-is, so don't re-parse their tables
+                # (deploy/reset unregister them, forcing a re-parse here)
+                key = (backplane_id, node_id)
+                if key in self.snn_coordinator.engines:
+                    continue
+                
                 try:
                     # Parse neuron table from memory
                     parsed_neurons = node.parse_neuron_table()
                     
                     if parsed_neurons:
-                        # Create or get engine
-                        key = (backplane_id, node_id)
-                        if key not in self.snn_coordinator.engines:
-                            engine = SNNEngine(node_id, backplane_id)
-                            engine.load_from_parsed_neurons(parsed_neurons)
-                            self.snn_coordinator.register_engine(engine)
-                            print(f"[SNN] Initialized engine for node {node_id}: {len(parsed_neurons)} neurons", file=sys.stderr, flush=True)
+                        engine = SNNEngine(node_id, backplane_id)
+                        engine.load_from_parsed_neurons(parsed_neurons)
+                        self.snn_coordinator.register_engine(engine)
+                        print(f"[SNN] Initialized engine for node {node_id}: {len(parsed_neurons)} neurons", file=sys.stderr, flush=True)
                 except Exception as e:
                     print(f"[SNN] Error initializing node {node_id}: {e}", file=sys.stderr, flush=True)
                     import traceback
@@ -284,11 +441,33 @@ class Z1APIServer:
         
         print(f"[SNN] Total engines initialized: {len(self.snn_coordinator.engines)}", file=sys.stderr, flush=True)
     
-    def run(self, debug: bool = False):
+    def _unregister_snn_engines(self):
+        """Stop and drop all SNN engines (and the coordinator's neuron index)."""
+        self.snn_coordinator.stop_all()
+        for backplane_id, node_id in list(self.snn_coordinator.engines):
+            self.snn_coordinator.unregister_engine(backplane_id, node_id)
+    
+    def run(self, debug: bool = False, threads: int = 16):
         """
-        Run Flask server.
+        Run the API server.
+        
+        Uses waitress (a production WSGI server with proper keep-alive) when
+        it is installed; otherwise, or in debug mode, Flask's development
+        server, switched to HTTP/1.1 so client sessions reuse connections.
         
         Args:
-            debug: Enable debug mode
+            debug: Enable debug mode (always uses the Flask server)
+            threads: waitress worker threads
         """
-        self.app.run(host=self.host, port=self.port, debug=debug, threaded=True)
+        if not debug:
+            try:
+                from waitress import serve
+            except ImportError:
+                pass
+            else:
+                serve(self.app, host=self.host, port=self.port,
+                      threads=threads, connection_limit=200)
+                return
+        
+        self.app.run(host=self.host, port=self.port, debug=debug, threaded=True,
+                     request_handler=KeepAliveRequestHandler)
@@ -4,16 +4,27 @@ Z1 Cluster Emulator
 Simulates multi-backplane Z1 cluster with bus communication.
 """
 
+import os
 import time
+import heapq
+import struct
 import threading
-from typing import Dict, List, Optional
-from dataclasses import dataclass
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional, Tuple
 from node import ComputeNode, NodeStatus
 
 
-@dataclass
-class BusMessage:
-    """Z1 bus message."""
+# Payload layouts of standard Z1 bus frames, compiled once for send_bus_packed:
+# node spike broadcast (node/node_main.c): neuron_id low word, neuron_id high
+# word (top byte only), value * 1000
+SPIKE_FRAME = struct.Struct('<HHH')
+# Controller spike injection (controller/z1_http_api.c): neuron_id low word,
+# neuron_id high word
+SPIKE_INJECT_FRAME = struct.Struct('<HH')
+
+
+class BusMessage(NamedTuple):
+    """Z1 bus message (immutable and slot-based - one is allocated per send)."""
     source_node: int
     target_node: int  # 255 = broadcast
     command: int
@@ -42,9 +53,16 @@ class Backplane:
         for i in range(self.node_count):
             self.nodes[i] = ComputeNode(node_id=i, backplane_id=backplane_id)
         
-        # Bus message queue
-        self.bus_queue: List[BusMessage] = []
+        # Senders append (ready_at, msg) to bus_inbox - deque.append is
+        # thread-safe, so sending never waits on a delivery tick
+        self.bus_inbox: deque = deque()
+        
+        # Delivery side: min-heap of (ready_at, seq, msg) so each tick only
+        # touches messages that are due; seq keeps FIFO order on equal times
+        self.bus_queue: List[Tuple[float, int, BusMessage]] = []
+        self._seq = 0
         self.bus_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
         
         # Statistics
         self.stats = {
@@ -67,51 +85,68 @@ class Backplane:
             command: Command byte
             data: Message data
         """
+        now = time.monotonic()
         msg = BusMessage(
             source_node=source,
             target_node=target,
             command=command,
-            data=data,
-            timestamp=time.time()
+            data=bytes(data),  # no copy for bytes; freezes a bytearray once
+            timestamp=now
         )
+        ready_at = now + self.bus_latency_us / 1_000_000
         
-        with self.bus_lock:
-            self.bus_queue.append(msg)
+        self.bus_inbox.append((ready_at, msg))
+        
+        with self.stats_lock:
             self.stats['messages_sent'] += 1
             if target == 255:
                 self.stats['broadcasts'] += 1
     
+    def send_bus_packed(self, source: int, target: int, command: int,
+                        frame: struct.Struct, *fields):
+        """
+        Send a fixed-layout frame on the bus.
+        
+        Args:
+            source: Source node ID
+            target: Target node ID (255 = broadcast)
+            command: Command byte
+            frame: Precompiled layout, e.g. SPIKE_FRAME
+            fields: Values packed into the frame
+        """
+        self.send_bus_message(source, target, command, frame.pack(*fields))
+    
     def process_bus_messages(self):
         """Process pending bus messages (simulate bus latency)."""
-        current_time = time.time()
-        latency_s = self.bus_latency_us / 1_000_000
+        current_time = time.monotonic()
         
         with self.bus_lock:
-            # Find messages ready for delivery
-            ready_messages = []
-            remaining_messages = []
-            
-            for msg in self.bus_queue:
-                if current_time - msg.timestamp >= latency_s:
-                    ready_messages.append(msg)
-                else:
-                    remaining_messages.append(msg)
+            # Move newly sent messages into the delivery heap
+            inbox = self.bus_inbox
+            while inbox:
+                ready_at, msg = inbox.popleft()
+                heapq.heappush(self.bus_queue, (ready_at, self._seq, msg))
+                self._seq += 1
             
-            self.bus_queue = remaining_messages
+            # Pop messages whose latency has elapsed
+            ready_messages = []
+            while self.bus_queue and self.bus_queue[0][0] <= current_time:
+                ready_messages.append(heapq.heappop(self.bus_queue)[2])
         
         # Deliver messages
         for msg in ready_messages:
             if msg.target_node == 255:
-                # Broadcast to all nodes
+                # Broadcast to all nodes - every recipient shares the one
+                # immutable payload object, nothing is copied per node
                 for node in self.nodes.values():
                     if node.node_id != msg.source_node:
-                        node.receive_message(msg.command, msg.data)
+                        node.receive_bus_message(msg.command, msg.data)
                 self.stats['messages_delivered'] += len(self.nodes) - 1
             else:
                 # Unicast to specific node
                 target = self.nodes.get(msg.target_node)
                 if target:
-                    target.receive_message(msg.command, msg.data)
+                    target.receive_bus_message(msg.command, msg.data)
                     self.stats['messages_delivered'] += 1
     
     def get_all_nodes_info(self) -> List[Dict]:
@@ -147,6 +182,12 @@ class Cluster:
                 bus_latency_us=bus_latency
             )
         
+        # Bumped whenever node membership may change; the node list below is
+        # rebuilt only when it no longer matches
+        self._version = 0
+        self._nodes_version = -1
+        self._nodes: List[ComputeNode] = []
+        
         # Simulation thread
         self.running = False
         self.sim_thread: Optional[threading.Thread] = None
@@ -155,7 +196,7 @@ class Cluster:
         self.stats = {
             'total_nodes': sum(bp.node_count for bp in self.backplanes.values()),
             'total_backplanes': len(self.backplanes),
-            'simulation_start': time.time()
+            'simulation_start': time.monotonic()
         }
     
     def _default_config(self) -> Dict:
@@ -189,21 +230,45 @@ class Cluster:
         if self.sim_thread:
             self.sim_thread.join(timeout=1.0)
     
+    def _pin_simulation_thread(self):
+        """
+        Pin the calling thread to one CPU, where the OS supports it.
+        
+        Uses simulation.cpu from the config, else the last CPU available.
+        Keeping the pacing thread off other cores' run queues reduces
+        migrations and tick jitter; it does not remove GIL contention.
+        """
+        if not hasattr(os, 'sched_setaffinity'):
+            return
+        cpu = self.config.get('simulation', {}).get('cpu')
+        if cpu is None:
+            cpu = max(os.sched_getaffinity(0))
+        try:
+            os.sched_setaffinity(0, {cpu})  # 0 = calling thread on Linux
+        except OSError:
+            pass
+    
     def _simulation_loop(self):
         """Main simulation loop."""
+        self._pin_simulation_thread()
         timestep_s = self.config.get('simulation', {}).get('timestep_us', 1000) / 1_000_000
         
+        # Absolute deadlines: sleeping until the next tick (rather than for
+        # timestep minus work) doesn't accumulate oversleep drift
+        next_deadline = time.monotonic()
+        
         while self.running:
-            start = time.time()
-            
             # Process bus messages for all backplanes
             for backplane in self.backplanes.values():
                 backplane.process_bus_messages()
             
-            # Sleep to maintain timestep
-            elapsed = time.time() - start
-            if elapsed < timestep_s:
-                time.sleep(timestep_s - elapsed)
+            # Sleep until the next tick; if we fell behind, restart the schedule
+            next_deadline += timestep_s
+            sleep_for = next_deadline - time.monotonic()
+            if sleep_for > 0:
+                time.sleep(sleep_for)
+            else:
+                next_deadline = time.monotonic()
     
     def get_node(self, backplane_id: int, node_id: int) -> Optional[ComputeNode]:
         """
@@ -222,23 +287,30 @@ class Cluster:
         return None
     
     def get_all_nodes(self) -> List[ComputeNode]:
-        """Get all nodes across all backplanes."""
-        nodes = []
-        for backplane in self.backplanes.values():
-            nodes.extend(backplane.nodes.values())
-        return nodes
+        """Get all nodes across all backplanes (shared list - don't modify)."""
+        if self._nodes_version != self._version:
+            nodes = []
+            for backplane in self.backplanes.values():
+                nodes.extend(backplane.nodes.values())
+            self._nodes = nodes
+            self._nodes_version = self._version
+        return self._nodes
+    
+    def get_nodes_info(self) -> List[Dict]:
+        """Get info dicts for all nodes (each node rebuilds only what changed)."""
+        return [node.get_info() for node in self.get_all_nodes()]
     
     def get_cluster_info(self) -> Dict:
         """Get cluster information."""
+        # Node status, uptime and bus stats change constantly, so only the node
+        # list is cached - these are computed fresh on every call
+        nodes = self.get_all_nodes()
         return {
             'total_backplanes': len(self.backplanes),
-            'total_nodes': sum(bp.node_count for bp in self.backplanes.values()),
-            'active_nodes': sum(
-                1 for node in self.get_all_nodes() 
-                if node.status == NodeStatus.ACTIVE
-            ),
+            'total_nodes': len(nodes),
+            'active_nodes': sum(1 for node in nodes if node.status == NodeStatus.ACTIVE),
             'simulation_running': self.running,
-            'uptime_s': time.time() - self.stats['simulation_start'],
+            'uptime_s': time.monotonic() - self.stats['simulation_start'],
             'backplanes': [
                 {
                     'id': bp_id,
@@ -253,6 +325,7 @@ class Cluster:
         """Reset entire cluster."""
         for backplane in self.backplanes.values():
             backplane.reset_all_nodes()
+        self._version += 1
     
     def send_bus_message(self, backplane_id: int, source: int, target: int, 
                         command: int, data: bytes):
@@ -7,13 +7,65 @@ Manages multi-backplane Z1 cluster configurations with environment variable supp
 
 import os
 import json
-from typing import List, Dict, Optional
+import time
+import threading
+from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
 
+try:
+    import orjson  # Optional - faster parse/serialize than the json module
+except ImportError:
+    orjson = None
 
-@dataclass
+# Searched in order when no (existing) config file is given
+DEFAULT_CONFIG_PATHS = (
+    os.path.expanduser('~/.neurofab/cluster.json'),
+    '/etc/neurofab/cluster.json',
+    './cluster.json'
+)
+
+EMULATOR_STATUS_URL = 'http://127.0.0.1:8000/api/emulator/status'
+EMULATOR_PROBE_TTL_S = 5.0
+
+# Last emulator probe result; 'ok' stays None until a probe gets an answer
+_EMULATOR_PROBE_CACHE = {'ts': 0.0, 'ok': None}
+
+
+def _emulator_running() -> bool:
+    """
+    Check for a local emulator, reusing the last answer for EMULATOR_PROBE_TTL_S.
+    
+    A probe that times out keeps the previous answer (if any) instead of
+    flipping it; a refused connection or non-emulator reply means no emulator.
+    """
+    cache = _EMULATOR_PROBE_CACHE
+    now = time.monotonic()
+    if cache['ok'] is not None and now - cache['ts'] < EMULATOR_PROBE_TTL_S:
+        return cache['ok']
+    
+    try:
+        import requests
+    except ImportError:
+        return False
+    
+    try:
+        response = requests.get(EMULATOR_STATUS_URL, timeout=0.5)
+        ok = response.status_code == 200 and bool(response.json().get('emulator'))
+    except requests.Timeout:
+        if cache['ok'] is None:
+            return False
+        ok = cache['ok']
+    except Exception:
+        ok = False
+    
+    cache['ts'] = now
+    cache['ok'] = ok
+    return ok
+
+
+@dataclass(frozen=True)
 class BackplaneConfig:
-    """Configuration for a single backplane."""
+    """Configuration for a single backplane (immutable; use dataclasses.replace)."""
     name: str
     controller_ip: str
     controller_port: int = 8000  # Default to emulator port; hardware uses 80
@@ -31,6 +83,8 @@ class ClusterConfig:
         """
         Initialize cluster configuration.
         
+        Nothing is read until the backplane list is first needed.
+        
         Priority order:
         1. Environment variables (Z1_CONTROLLER_IP, Z1_CONTROLLER_PORT) - HIGHEST
         2. Specified config file
@@ -40,57 +94,88 @@ class ClusterConfig:
         Args:
             config_file: Path to configuration file (JSON)
         """
-        self.backplanes: List[BackplaneConfig] = []
+        self._backplanes: Optional[List[BackplaneConfig]] = None
+        self._by_name: Dict[str, BackplaneConfig] = {}
+        self._by_ip: Dict[str, BackplaneConfig] = {}
         self.config_file = config_file
+    
+    def _ensure_loaded(self):
+        """Populate the backplane list on first use."""
+        if self._backplanes is not None:
+            return
+        self._backplanes = []
+        self._by_name = {}
+        self._by_ip = {}
         
         # PRIORITY 1: Check environment variables FIRST
-        controller_ip = os.environ.get('Z1_CONTROLLER_IP')
-        if controller_ip:
+        if os.environ.get('Z1_CONTROLLER_IP'):
             # Environment variables take precedence over everything
             self._load_from_environment()
         else:
-            # PRIORITY 2-3: Load from config file if no env vars
-            if config_file and os.path.exists(config_file):
-                self.load(config_file)
-            else:
-                # Try default locations
-                self._load_default_config()
-    
-    def _load_default_config(self):
-        """Load configuration from default locations."""
-        default_paths = [
-            os.path.expanduser('~/.neurofab/cluster.json'),
-            '/etc/neurofab/cluster.json',
-            './cluster.json'
-        ]
+            # PRIORITY 2-3: Load from config file (or default locations)
+            for path in self.config_candidates(self.config_file):
+                if self._try_load(path):
+                    break
+    
+    @property
+    def backplanes(self) -> List[BackplaneConfig]:
+        """Configured backplanes (loaded lazily)."""
+        self._ensure_loaded()
+        return self._backplanes
+    
+    def _index(self, backplane: BackplaneConfig):
+        """Add a backplane to the lookup dicts (first entry wins, like a scan)."""
+        self._by_name.setdefault(backplane.name, backplane)
+        self._by_ip.setdefault(backplane.controller_ip, backplane)
+    
+    def _try_load(self, config_file: str) -> bool:
+        """Load config_file if it exists (one open, no separate exists check)."""
+        try:
+            self.load(config_file)
+        except FileNotFoundError:
+            return False
+        return True
+    
+    @staticmethod
+    def config_candidates(config_file: Optional[str] = None) -> Tuple[str, ...]:
+        """Files a ClusterConfig tries, in order: config_file, then the defaults."""
+        if config_file:
+            return (config_file,) + DEFAULT_CONFIG_PATHS
+        return DEFAULT_CONFIG_PATHS
+    
+    def _env_controller(self) -> Optional[Tuple[str, int]]:
+        """
+        Read Z1_CONTROLLER_IP / Z1_CONTROLLER_PORT.
+        
+        Returns:
+            (controller_ip, controller_port), or None if the IP is not set
+        """
+        controller_ip = os.environ.get('Z1_CONTROLLER_IP')
+        if not controller_ip:
+            return None
         
-        for path in default_paths:
-            if os.path.exists(path):
-                self.load(path)
-                return
+        # Auto-detect port based on IP if not explicitly set
+        controller_port_str = os.environ.get('Z1_CONTROLLER_PORT')
+        if controller_port_str:
+            try:
+                return controller_ip, int(controller_port_str)
+            except ValueError:
+                pass
+        return controller_ip, self._auto_detect_port(controller_ip)
     
     def _load_from_environment(self):
         """Load configuration from environment variables."""
-        controller_ip = os.environ.get('Z1_CONTROLLER_IP')
-        controller_port_str = os.environ.get('Z1_CONTROLLER_PORT')
-        
-        if controller_ip:
-            # Auto-detect port based on IP if not explicitly set
-            if controller_port_str:
-                try:
-                    controller_port = int(controller_port_str)
-                except ValueError:
-                    controller_port = self._auto_detect_port(controller_ip)
-            else:
-                controller_port = self._auto_detect_port(controller_ip)
-            
-            self.backplanes.append(BackplaneConfig(
+        controller = self._env_controller()
+        if controller:
+            backplane = BackplaneConfig(
                 name='env-backplane',
-                controller_ip=controller_ip,
-                controller_port=controller_port,
+                controller_ip=controller[0],
+                controller_port=controller[1],
                 node_count=16,
                 description='From environment variables'
-            ))
+            )
+            self._backplanes.append(backplane)
+            self._index(backplane)
     
     def _auto_detect_port(self, ip: str) -> int:
         """Auto-detect port based on IP address."""
@@ -107,10 +192,13 @@ class ClusterConfig:
         Args:
             config_file: Path to configuration file
         """
-        with open(config_file, 'r') as f:
-            config_data = json.load(f)
+        with open(config_file, 'rb') as f:
+            data = f.read()
+        config_data = orjson.loads(data) if orjson else json.loads(data)
         
-        self.backplanes = []
+        self._backplanes = []
+        self._by_name = {}
+        self._by_ip = {}
         for bp_data in config_data.get('backplanes', []):
             backplane = BackplaneConfig(
                 name=bp_data['name'],
@@ -119,7 +207,8 @@ class ClusterConfig:
                 node_count=bp_data.get('node_count', 16),
                 description=bp_data.get('description', '')
             )
-            self.backplanes.append(backplane)
+            self._backplanes.append(backplane)
+            self._index(backplane)
         
         self.config_file = config_file
     
@@ -152,38 +241,48 @@ class ClusterConfig:
         # Create directory if it doesn't exist
         os.makedirs(os.path.dirname(os.path.abspath(config_file)), exist_ok=True)
         
-        with open(config_file, 'w') as f:
-            json.dump(config_data, f, indent=2)
+        if orjson:
+            data = orjson.dumps(config_data, option=orjson.OPT_INDENT_2)
+        else:
+            data = json.dumps(config_data, indent=2).encode()
+        
+        with open(config_file, 'wb') as f:
+            f.write(data)
     
     def add_backplane(self, backplane: BackplaneConfig):
         """Add a backplane to the configuration."""
-        self.backplanes.append(backplane)
+        self._ensure_loaded()
+        self._backplanes.append(backplane)
+        self._index(backplane)
     
     def remove_backplane(self, name: str):
         """Remove a backplane by name."""
-        self.backplanes = [bp for bp in self.backplanes if bp.name != name]
+        self._ensure_loaded()
+        self._backplanes = [bp for bp in self._backplanes if bp.name != name]
+        self._by_name = {}
+        self._by_ip = {}
+        for bp in self._backplanes:
+            self._index(bp)
     
     def get_backplane(self, name: str) -> Optional[BackplaneConfig]:
         """Get a backplane by name."""
-        for bp in self.backplanes:
-            if bp.name == name:
-                return bp
-        return None
+        self._ensure_loaded()
+        return self._by_name.get(name)
     
     def get_backplane_by_ip(self, ip: str) -> Optional[BackplaneConfig]:
         """Get a backplane by controller IP."""
-        for bp in self.backplanes:
-            if bp.controller_ip == ip:
-                return bp
-        return None
+        self._ensure_loaded()
+        return self._by_ip.get(ip)
     
     def get_all_controllers(self) -> List[str]:
         """Get list of all controller IPs."""
-        return [bp.controller_ip for bp in self.backplanes]
+        self._ensure_loaded()
+        return [bp.controller_ip for bp in self._backplanes]
     
     def get_total_nodes(self) -> int:
         """Get total number of nodes across all backplanes."""
-        return sum(bp.node_count for bp in self.backplanes)
+        self._ensure_loaded()
+        return sum(bp.node_count for bp in self._backplanes)
     
     def get_default_backplane(self) -> BackplaneConfig:
         """
@@ -195,44 +294,31 @@ class ClusterConfig:
         3. Auto-detect emulator at localhost:8000
         4. Default to real hardware at 192.168.1.201:80
         """
-        # Check environment variable
-        controller_ip = os.environ.get('Z1_CONTROLLER_IP')
-        if controller_ip:
-            controller_port_str = os.environ.get('Z1_CONTROLLER_PORT')
-            if controller_port_str:
-                try:
-                    controller_port = int(controller_port_str)
-                except ValueError:
-                    controller_port = self._auto_detect_port(controller_ip)
-            else:
-                controller_port = self._auto_detect_port(controller_ip)
-            
+        # Check environment variable (no need to load the config at all)
+        controller = self._env_controller()
+        if controller:
             return BackplaneConfig(
                 name='default',
-                controller_ip=controller_ip,
-                controller_port=controller_port,
+                controller_ip=controller[0],
+                controller_port=controller[1],
                 node_count=16,
                 description='From environment'
             )
         
         # Return first backplane if available
-        if self.backplanes:
-            return self.backplanes[0]
+        self._ensure_loaded()
+        if self._backplanes:
+            return self._backplanes[0]
         
         # Try to auto-detect emulator
-        try:
-            import requests
-            response = requests.get('http://127.0.0.1:8000/api/emulator/status', timeout=0.5)
-            if response.status_code == 200 and response.json().get('emulator'):
-                return BackplaneConfig(
-                    name='emulator',
-                    controller_ip='127.0.0.1',
-                    controller_port=8000,
-                    node_count=16,
-                    description='Auto-detected emulator'
-                )
-        except:
-            pass
+        if _emulator_running():
+            return BackplaneConfig(
+                name='emulator',
+                controller_ip='127.0.0.1',
+                controller_port=8000,
+                node_count=16,
+                description='Auto-detected emulator'
+            )
         
         # Default to real hardware
         return BackplaneConfig(
@@ -245,11 +331,13 @@ class ClusterConfig:
     
     def __len__(self):
         """Return number of backplanes."""
-        return len(self.backplanes)
+        self._ensure_loaded()
+        return len(self._backplanes)
     
     def __iter__(self):
         """Iterate over backplanes."""
-        return iter(self.backplanes)
+        self._ensure_loaded()
+        return iter(self._backplanes)
 
 
 def create_default_config(output_file: str):
@@ -282,17 +370,60 @@ def create_default_config(output_file: str):
     print(f"Created default configuration: {output_file}")
 
 
+# config_file argument -> (stamp, ClusterConfig); see get_cluster_config
+_CONFIG_CACHE: Dict[Optional[str], Tuple[tuple, ClusterConfig]] = {}
+_CONFIG_LOCK = threading.Lock()
+
+
+def _config_stamp(config_file: Optional[str]) -> tuple:
+    """Identify what a ClusterConfig(config_file) would load right now."""
+    controller_ip = os.environ.get('Z1_CONTROLLER_IP')
+    if controller_ip:
+        return ('env', controller_ip, os.environ.get('Z1_CONTROLLER_PORT'))
+    
+    # One stat per candidate both finds the file and reads its mtime
+    for path in ClusterConfig.config_candidates(config_file):
+        try:
+            return ('file', path, os.stat(path).st_mtime_ns)
+        except OSError:
+            continue
+    return ('none',)
+
+
 def get_cluster_config(config_file: Optional[str] = None) -> ClusterConfig:
     """
     Get cluster configuration (singleton pattern).
     
+    Repeat calls return the same instance until the effective config file,
+    its mtime or the Z1_CONTROLLER_* environment changes. Treat the result
+    as read-only; construct ClusterConfig directly to edit and save.
+    
     Args:
         config_file: Optional path to configuration file
         
     Returns:
         ClusterConfig instance
     """
-    return ClusterConfig(config_file)
+    with _CONFIG_LOCK:
+        stamp = _config_stamp(config_file)
+        cached = _CONFIG_CACHE.get(config_file)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        
+        config = ClusterConfig(config_file)
+        _CONFIG_CACHE[config_file] = (stamp, config)
+        return config
+
+
+def invalidate_cluster_config():
+    """
+    Drop all cached configurations (next get_cluster_config reloads).
+
+    For tests and tools that rewrite a config file within one mtime tick,
+    where the stamp alone would not notice the change.
+    """
+    with _CONFIG_LOCK:
+        _CONFIG_CACHE.clear()
 
 
 if __name__ == '__main__':
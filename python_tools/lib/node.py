@@ -6,11 +6,28 @@ Simulates an RP2350B-based compute node with 2MB Flash and 8MB PSRAM.
 
 import time
 import struct
+from collections import deque
+from collections.abc import Sequence
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 
 
+# 256-byte firmware header: magic, version, size, crc32, name (32),
+# description (128), build timestamp, zero padding
+FIRMWARE_HEADER = struct.Struct('<4I32s128sQ72x')
+
+# One 256-byte neuron table entry: state (16), synapse metadata (8),
+# parameters (8), 8 reserved bytes, then the synapses that fit (54 x 4)
+NEURON_ENTRY = struct.Struct('<HHffIHHIfI8x54I')
+NEURON_ENTRY_SYNAPSES = 54
+NEURON_ENTRY_EMPTY = bytes(NEURON_ENTRY.size)
+NEURON_TABLE_MAX_BYTES = 1024 * 1024  # Max 1MB of neuron tables
+NEURON_TABLE_MAX_NEURONS = 1000
+
+MESSAGE_QUEUE_SIZE = 1024  # Received bus messages kept per node
+
+
 class NodeStatus(Enum):
     """Node status states."""
     INACTIVE = 0
@@ -44,10 +61,10 @@ class FirmwareHeader:
         if len(data) < 256:
             raise ValueError("Firmware header must be 256 bytes")
         
-        magic, version, firmware_size, crc32 = struct.unpack_from('<4I', data, 0)
-        name = data[16:48].decode('utf-8', errors='ignore').rstrip('\x00')
-        description = data[48:176].decode('utf-8', errors='ignore').rstrip('\x00')
-        build_timestamp = struct.unpack_from('<Q', data, 176)[0]
+        (magic, version, firmware_size, crc32,
+         name, description, build_timestamp) = FIRMWARE_HEADER.unpack_from(data, 0)
+        name = name.decode('utf-8', errors='ignore').rstrip('\x00')
+        description = description.decode('utf-8', errors='ignore').rstrip('\x00')
         
         return cls(
             magic=magic,
@@ -61,20 +78,22 @@ class FirmwareHeader:
     
     def to_bytes(self) -> bytes:
         """Convert firmware header to bytes."""
-        header = bytearray(256)
-        struct.pack_into('<4I', header, 0, self.magic, self.version, 
-                        self.firmware_size, self.crc32)
-        name_bytes = self.name.encode('utf-8')[:32]
-        header[16:16+len(name_bytes)] = name_bytes
-        desc_bytes = self.description.encode('utf-8')[:128]
-        header[48:48+len(desc_bytes)] = desc_bytes
-        struct.pack_into('<Q', header, 176, self.build_timestamp)
-        return bytes(header)
+        # 's' fields truncate and null-pad the strings to their slots
+        return FIRMWARE_HEADER.pack(self.magic, self.version,
+                                    self.firmware_size, self.crc32,
+                                    self.name.encode('utf-8'),
+                                    self.description.encode('utf-8'),
+                                    self.build_timestamp)
 
 
 @dataclass
 class ParsedNeuron:
     """Parsed neuron from memory."""
+    # No per-instance __dict__ - there can be thousands of these
+    __slots__ = ('neuron_id', 'flags', 'membrane_potential', 'threshold',
+                 'last_spike_time', 'synapse_count', 'leak_rate',
+                 'refractory_period_us', 'synapses')
+    
     neuron_id: int
     flags: int
     membrane_potential: float
@@ -86,6 +105,59 @@ class ParsedNeuron:
     synapses: List[Tuple[int, int]]  # (source_global_id, weight)
 
 
+def _neuron_from_fields(fields: Tuple) -> Optional[ParsedNeuron]:
+    """Build a ParsedNeuron from one NEURON_ENTRY tuple."""
+    (neuron_id, flags, membrane_potential, threshold, last_spike_time,
+     synapse_count, synapse_capacity, reserved,
+     leak_rate, refractory_period_us) = fields[:10]
+    
+    # More synapses than fit in the 256-byte entry - corrupt entry
+    if synapse_count > NEURON_ENTRY_SYNAPSES:
+        return None
+    
+    # Each synapse is [source_id:24][weight:8]
+    synapses = [((value >> 8) & 0xFFFFFF, value & 0xFF)
+                for value in fields[10:10 + synapse_count]]
+    
+    return ParsedNeuron(
+        neuron_id=neuron_id,
+        flags=flags,
+        membrane_potential=membrane_potential,
+        threshold=threshold,
+        last_spike_time=last_spike_time,
+        synapse_count=synapse_count,
+        leak_rate=leak_rate,
+        refractory_period_us=refractory_period_us,
+        synapses=synapses
+    )
+
+
+class NeuronTableView(Sequence):
+    """
+    Parsed neuron table, kept as raw NEURON_ENTRY tuples.
+    
+    ParsedNeuron objects are built on access, so callers that only need
+    the count (get_info) or a few neurons don't pay for the whole table.
+    """
+    
+    def __init__(self, rows: Optional[List[Tuple]] = None):
+        self._rows = rows if rows is not None else []
+    
+    def __len__(self):
+        return len(self._rows)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [_neuron_from_fields(row) for row in self._rows[index]]
+        return _neuron_from_fields(self._rows[index])
+    
+    def __iter__(self):
+        return map(_neuron_from_fields, self._rows)
+    
+    def __repr__(self):
+        return f"NeuronTableView({len(self._rows)} neurons)"
+
+
 class Memory:
     """Simulates Flash and PSRAM memory."""
     
@@ -103,6 +175,8 @@ class Memory:
         # Memory map
         self.FLASH_BASE = 0x10000000
         self.PSRAM_BASE = 0x20000000
+        self._flash_end = self.FLASH_BASE + flash_size
+        self._psram_end = self.PSRAM_BASE + psram_size
         
         # Firmware regions
         self.BOOTLOADER_ADDR = 0x10000000
@@ -119,35 +193,59 @@ class Memory:
         """Read from memory."""
         if addr >= self.PSRAM_BASE:
             # PSRAM
-            offset = addr - self.PSRAM_BASE
-            if offset + length > len(self.psram):
+            if addr + length > self._psram_end:
                 raise ValueError(f"PSRAM read out of bounds: 0x{addr:08X}")
+            offset = addr - self.PSRAM_BASE
             return bytes(self.psram[offset:offset+length])
         elif addr >= self.FLASH_BASE:
             # Flash
-            offset = addr - self.FLASH_BASE
-            if offset + length > len(self.flash):
+            if addr + length > self._flash_end:
                 raise ValueError(f"Flash read out of bounds: 0x{addr:08X}")
+            offset = addr - self.FLASH_BASE
             return bytes(self.flash[offset:offset+length])
         else:
             raise ValueError(f"Invalid memory address: 0x{addr:08X}")
     
+    def view(self, addr: int, length: Optional[int] = None) -> memoryview:
+        """
+        Zero-copy view of memory (read() returns a copy).
+        
+        Args:
+            addr: Start address
+            length: Number of bytes (None = up to the end of the region)
+        """
+        if addr >= self.PSRAM_BASE:
+            region, base, end, name = self.psram, self.PSRAM_BASE, self._psram_end, 'PSRAM'
+        elif addr >= self.FLASH_BASE:
+            region, base, end, name = self.flash, self.FLASH_BASE, self._flash_end, 'Flash'
+        else:
+            raise ValueError(f"Invalid memory address: 0x{addr:08X}")
+        
+        if length is None:
+            length = end - addr
+        if length < 0 or addr + length > end:
+            raise ValueError(f"{name} view out of bounds: 0x{addr:08X}")
+        offset = addr - base
+        return memoryview(region)[offset:offset + length]
+    
     def write(self, addr: int, data: bytes) -> int:
         """Write to memory."""
         if addr >= self.PSRAM_BASE:
             # PSRAM (writable)
-            offset = addr - self.PSRAM_BASE
-            if offset + len(data) > len(self.psram):
+            length = len(data)
+            if addr + length > self._psram_end:
                 raise ValueError(f"PSRAM write out of bounds: 0x{addr:08X}")
-            self.psram[offset:offset+len(data)] = data
-            return len(data)
+            offset = addr - self.PSRAM_BASE
+            self.psram[offset:offset+length] = data
+            return length
         elif addr >= self.FLASH_BASE:
             # Flash (writable in emulator)
-            offset = addr - self.FLASH_BASE
-            if offset + len(data) > len(self.flash):
+            length = len(data)
+            if addr + length > self._flash_end:
                 raise ValueError(f"Flash write out of bounds: 0x{addr:08X}")
-            self.flash[offset:offset+len(data)] = data
-            return len(data)
+            offset = addr - self.FLASH_BASE
+            self.flash[offset:offset+length] = data
+            return length
         else:
             raise ValueError(f"Invalid memory address: 0x{addr:08X}")
     
@@ -169,7 +267,7 @@ class ComputeNode:
         """
         self.node_id = node_id
         self.backplane_id = backplane_id
-        self.status = NodeStatus.ACTIVE
+        self._status = NodeStatus.ACTIVE
         self.memory = Memory()
         self.led = LEDState()
         
@@ -179,28 +277,55 @@ class ComputeNode:
         # Statistics
         self.boot_time = time.time()
         self.last_activity = time.time()
-        self.stats = {
-            'bus_messages_sent': 0,
-            'bus_messages_received': 0,
-            'memory_reads': 0,
-            'memory_writes': 0,
-            'resets': 0
-        }
         
-        # Message queue (simulates bus messages)
-        self.message_queue: List[Tuple[int, bytes]] = []
+        # Counters are plain ints on the hot path; see the stats property
+        self._n_bus_tx = 0
+        self._n_bus_rx = 0
+        self._n_reads = 0
+        self._n_writes = 0
+        self._n_resets = 0
+        
+        # Message queue (simulates bus messages); oldest dropped when full
+        self.message_queue: deque = deque(maxlen=MESSAGE_QUEUE_SIZE)
         
         # Parsed neuron table
-        self.neuron_table: List[ParsedNeuron] = []
+        self.neuron_table = NeuronTableView()
+        
+        # get_info() fields that only change on reset / neuron table load;
+        # rebuilt when dirty is set
+        self.dirty = True
+        self._info: Dict = {}
+    
+    @property
+    def status(self) -> NodeStatus:
+        """Node status."""
+        return self._status
+    
+    @status.setter
+    def status(self, status: NodeStatus):
+        self._status = status
+        self.dirty = True
+    
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Snapshot of the node's activity counters."""
+        return {
+            'bus_messages_sent': self._n_bus_tx,
+            'bus_messages_received': self._n_bus_rx,
+            'memory_reads': self._n_reads,
+            'memory_writes': self._n_writes,
+            'resets': self._n_resets
+        }
     
     def reset(self):
         """Reset node."""
         self.status = NodeStatus.ACTIVE
         self.led = LEDState()
         self.boot_time = time.time()
-        self.stats['resets'] += 1
+        self._n_resets += 1
         self.message_queue.clear()
-        self.neuron_table.clear()
+        self.neuron_table = NeuronTableView()
+        self.dirty = True
     
     def get_uptime_ms(self) -> int:
         """Get uptime in milliseconds."""
@@ -212,13 +337,13 @@ class ComputeNode:
     
     def read_memory(self, addr: int, length: int) -> bytes:
         """Read from node memory."""
-        self.stats['memory_reads'] += 1
+        self._n_reads += 1
         self.last_activity = time.time()
         return self.memory.read(addr, length)
     
     def write_memory(self, addr: int, data: bytes) -> int:
         """Write to node memory."""
-        self.stats['memory_writes'] += 1
+        self._n_writes += 1
         self.last_activity = time.time()
         return self.memory.write(addr, data)
     
@@ -243,16 +368,16 @@ class ComputeNode:
     
     def send_bus_message(self, command: int, data: bytes):
         """Send message on Z1 bus (simulated)."""
-        self.stats['bus_messages_sent'] += 1
+        self._n_bus_tx += 1
         self.last_activity = time.time()
     
     def receive_bus_message(self, command: int, data: bytes):
         """Receive message from Z1 bus."""
         self.message_queue.append((command, data))
-        self.stats['bus_messages_received'] += 1
+        self._n_bus_rx += 1
         self.last_activity = time.time()
     
-    def parse_neuron_table(self, addr: int = 0x20100000) -> List[ParsedNeuron]:
+    def parse_neuron_table(self, addr: int = 0x20100000) -> NeuronTableView:
         """
         Parse neuron table from memory.
         
@@ -260,102 +385,70 @@ class ComputeNode:
             addr: Address of neuron table in PSRAM
             
         Returns:
-            List of parsed neurons
+            Parsed neurons (ParsedNeuron objects are built on access)
         """
-        neurons = []
+        rows = []
         
-        # Read first entry to check if there's data
         try:
-            first_entry = self.memory.read(addr, 256)
+            # Check if memory is empty (all zeros) - a single memcmp
+            if self.memory.read(addr, NEURON_ENTRY.size) == NEURON_ENTRY_EMPTY:
+                return NeuronTableView()
             
-            # Check if memory is empty (all zeros)
-            if all(b == 0 for b in first_entry):
-                return neurons
+            # View (not copy) the table region, whole entries only
+            table = self.memory.view(addr)[:NEURON_TABLE_MAX_BYTES]
+            table = table[:len(table) - len(table) % NEURON_ENTRY.size]
             
             # Parse entries until we hit empty data
-            offset = 0
-            while offset < 1024 * 1024:  # Max 1MB of neuron tables
-                entry_data = self.memory.read(addr + offset, 256)
-                
-                # Check if this entry is empty
-                neuron_id = struct.unpack_from('<H', entry_data, 0)[0]
-                if neuron_id == 0 and offset > 0:
+            for index, fields in enumerate(NEURON_ENTRY.iter_unpack(table)):
+                if fields[0] == 0 and index > 0:
                     # Reached end of table
                     break
                 
-                # Parse neuron entry
-                neuron = self._parse_neuron_entry(entry_data)
-                if neuron:
-                    neurons.append(neuron)
-                
-                offset += 256
+                # More synapses than fit in the entry - skip corrupt entry
+                if fields[5] > NEURON_ENTRY_SYNAPSES:
+                    continue
+                rows.append(fields)
                 
                 # Safety limit
-                if len(neurons) >= 1000:
+                if len(rows) >= NEURON_TABLE_MAX_NEURONS:
                     break
             
         except Exception as e:
             print(f"Error parsing neuron table: {e}")
         
-        self.neuron_table = neurons
-        return neurons
+        self.neuron_table = NeuronTableView(rows)
+        self.dirty = True
+        return self.neuron_table
     
     def _parse_neuron_entry(self, entry_data: bytes) -> Optional[ParsedNeuron]:
         """Parse single neuron entry (256 bytes)."""
-        if len(entry_data) < 256:
-            return None
-        
-        try:
-            # Neuron state (16 bytes)
-            neuron_id, flags, membrane_potential, threshold, last_spike_time = \
-                struct.unpack_from('<HHffI', entry_data, 0)
-            
-            # Synapse metadata (8 bytes)
-            synapse_count, synapse_capacity, reserved = \
-                struct.unpack_from('<HHI', entry_data, 16)
-            
-            # Neuron parameters (8 bytes)
-            leak_rate, refractory_period_us = \
-                struct.unpack_from('<fI', entry_data, 24)
-            
-            # Parse synapses (240 bytes, 60 × 4 bytes)
-            synapses = []
-            for i in range(min(synapse_count, 60)):
-                synapse_value = struct.unpack_from('<I', entry_data, 40 + i * 4)[0]
-                source_id = (synapse_value >> 8) & 0xFFFFFF
-                weight = synapse_value & 0xFF
-                synapses.append((source_id, weight))
-            
-            return ParsedNeuron(
-                neuron_id=neuron_id,
-                flags=flags,
-                membrane_potential=membrane_potential,
-                threshold=threshold,
-                last_spike_time=last_spike_time,
-                synapse_count=synapse_count,
-                leak_rate=leak_rate,
-                refractory_period_us=refractory_period_us,
-                synapses=synapses
-            )
-        except Exception:
+        if len(entry_data) < NEURON_ENTRY.size:
             return None
+        return _neuron_from_fields(NEURON_ENTRY.unpack_from(entry_data))
     
     def get_info(self) -> Dict:
         """Get node information."""
-        free_mem = self.get_free_memory()
-        return {
-            'id': self.node_id,  # Tools expect 'id' field
-            'node_id': self.node_id,
-            'backplane_id': self.backplane_id,
-            'status': self.status.name.lower(),
-            'uptime_ms': self.get_uptime_ms(),
-            'memory_free': free_mem,  # Tools expect 'memory_free' field
-            'free_memory': free_mem,
-            'led_state': {
-                'r': self.led.r,
-                'g': self.led.g,
-                'b': self.led.b
-            },
-            'stats': self.stats.copy(),
-            'neuron_count': len(self.neuron_table)
+        if self.dirty:
+            free_mem = self.get_free_memory()
+            self._info = {
+                'id': self.node_id,  # Tools expect 'id' field
+                'node_id': self.node_id,
+                'backplane_id': self.backplane_id,
+                'status': self.status.name.lower(),
+                'memory_free': free_mem,  # Tools expect 'memory_free' field
+                'free_memory': free_mem,
+                'neuron_count': len(self.neuron_table)
+            }
+            self.dirty = False
+        
+        # Uptime and counters change constantly - always fresh. The LED is
+        # a mutable LEDState that can change without going through the node.
+        info = dict(self._info)
+        info['led_state'] = {
+            'r': self.led.r,
+            'g': self.led.g,
+            'b': self.led.b
         }
+        info['uptime_ms'] = self.get_uptime_ms()
+        info['stats'] = self.stats
+        return info
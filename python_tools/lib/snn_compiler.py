@@ -54,7 +54,9 @@ class SNNCompiler:
         self.topology = topology
         self.backplane_config = backplane_config or {}
         self.neurons = []
+        self._neuron_by_gid: Dict[int, NeuronConfig] = {}  # encoded global_id -> neuron
         self.node_assignments = {}  # (backplane_id, node_id) -> [global_neuron_ids]
+        self._global_to_node = {}  # sequential global_id -> (backplane, node, local_id)
         self.layer_map = {}
         self.neuron_map = {}  # global_id -> (backplane, node, local_id)
         self.sequential_to_encoded = {}  # sequential_id -> encoded_id
@@ -145,6 +147,12 @@ class SNNCompiler:
                     self.node_assignments[key].append(neuron_id)
                 
                 node_idx += 1
+        
+        # Reverse index for _find_node_for_neuron (first assignment wins)
+        self._global_to_node = {}
+        for (bp_name, node_id), neuron_list in self.node_assignments.items():
+            for local_id, global_id in enumerate(neuron_list):
+                self._global_to_node.setdefault(global_id, (bp_name, node_id, local_id))
     
     def _build_neuron_configs(self):
         """Build neuron configurations from layers."""
@@ -193,6 +201,7 @@ class SNNCompiler:
                 )
                 
                 self.neurons.append(neuron)
+                self._neuron_by_gid.setdefault(encoded_global_id, neuron)
                 self.layer_map[encoded_global_id] = layer_id
                 self.neuron_map[encoded_global_id] = (bp_name, node_id, local_id)
     
@@ -203,16 +212,17 @@ class SNNCompiler:
         Returns:
             Tuple of (backplane_name, node_id, local_neuron_id)
         """
-        for (bp_name, node_id), neuron_list in self.node_assignments.items():
-            if global_id in neuron_list:
-                local_id = neuron_list.index(global_id)
-                return (bp_name, node_id, local_id)
-        raise ValueError(f"Neuron {global_id} not assigned to any node")
+        location = self._global_to_node.get(global_id)
+        if location is None:
+            raise ValueError(f"Neuron {global_id} not assigned to any node")
+        return location
     
     def _generate_connections(self):
         """Generate synaptic connections based on topology."""
         connections = self.topology.get('connections', [])
-        layers = self.topology['layers']
+        layers_by_id = {}
+        for layer in self.topology['layers']:
+            layers_by_id.setdefault(layer['layer_id'], layer)
         
         for conn in connections:
             # Check if this is an explicit neuron-to-neuron connection
@@ -225,8 +235,8 @@ class SNNCompiler:
             conn_type = conn['connection_type']
             
             # Find source and target layers
-            source_layer = next(l for l in layers if l['layer_id'] == source_layer_id)
-            target_layer = next(l for l in layers if l['layer_id'] == target_layer_id)
+            source_layer = layers_by_id[source_layer_id]
+            target_layer = layers_by_id[target_layer_id]
             
             source_start = source_layer['neuron_ids'][0]
             source_end = source_layer['neuron_ids'][1]
@@ -260,7 +270,7 @@ class SNNCompiler:
         target_id = self.sequential_to_encoded.get(target_id_seq, target_id_seq)
         
         # Find target neuron by encoded ID
-        target_neuron = next((n for n in self.neurons if n.global_id == target_id), None)
+        target_neuron = self._neuron_by_gid.get(target_id)
         if not target_neuron:
             print(f"Warning: Target neuron {target_id_seq} (encoded {target_id}) not found")
             return
@@ -289,34 +299,43 @@ class SNNCompiler:
         weight_mean = conn_config.get('weight_mean', 0.5)
         weight_stddev = conn_config.get('weight_stddev', 0.1)
         
-        for target_id_seq in range(target_start, target_end + 1):
+        # Each target keeps at most 54 synapses, filled from the first
+        # sources, so only that many weights per target are ever used
+        n_targets = max(0, target_end - target_start + 1)
+        n_sources = max(0, min(source_end - source_start + 1, 54))
+        shape = (n_targets, n_sources)
+        
+        # Generate all weights at once. The generator is seeded from the random
+        # module, so random.seed() also makes these layers reproducible.
+        rng = np.random.default_rng(random.getrandbits(64))
+        if weight_init == 'random_normal':
+            weights = np.clip(rng.normal(weight_mean, weight_stddev, shape), 0.0, 1.0)
+        elif weight_init == 'random_uniform':
+            weight_min = conn_config.get('weight_min', 0.0)
+            weight_max = conn_config.get('weight_max', 1.0)
+            weights = rng.uniform(weight_min, weight_max, shape)
+        elif weight_init == 'constant':
+            weights = np.full(shape, conn_config.get('weight_value', 0.5))
+        else:
+            weights = np.full(shape, 0.5)
+        
+        # Convert to 8-bit integers (astype truncates like int())
+        weights = (weights * 255).astype(np.int64).tolist()
+        
+        # Convert sequential IDs to encoded IDs for synapses
+        source_ids = [self.sequential_to_encoded.get(source_id_seq, source_id_seq)
+                      for source_id_seq in range(source_start, source_start + n_sources)]
+        
+        for row, target_id_seq in enumerate(range(target_start, target_end + 1)):
             # Convert sequential ID to encoded ID
             target_id = self.sequential_to_encoded.get(target_id_seq, target_id_seq)
-            target_neuron = next(n for n in self.neurons if n.global_id == target_id)
+            target_neuron = self._neuron_by_gid[target_id]
             
-            for source_id_seq in range(source_start, source_end + 1):
-                # Convert sequential ID to encoded ID for synapse
-                source_id = self.sequential_to_encoded.get(source_id_seq, source_id_seq)
-                
-                # Generate weight
-                if weight_init == 'random_normal':
-                    weight_float = random.gauss(weight_mean, weight_stddev)
-                    weight_float = max(0.0, min(1.0, weight_float))
-                elif weight_init == 'random_uniform':
-                    weight_min = conn_config.get('weight_min', 0.0)
-                    weight_max = conn_config.get('weight_max', 1.0)
-                    weight_float = random.uniform(weight_min, weight_max)
-                elif weight_init == 'constant':
-                    weight_float = conn_config.get('weight_value', 0.5)
-                else:
-                    weight_float = 0.5
-                
-                # Convert to 8-bit integer
-                weight = int(weight_float * 255)
-                
-                # Add synapse (limit to max synapses)
-                if len(target_neuron.synapses) < 54:
-                    target_neuron.synapses.append((source_id, weight))
+            # Add synapses (limit to max synapses)
+            remaining = 54 - len(target_neuron.synapses)
+            if remaining > 0:
+                target_neuron.synapses.extend(
+                    zip(source_ids[:remaining], weights[row][:remaining]))
     
     def _generate_sparse_random(self, source_start: int, source_end: int,
                                 target_start: int, target_end: int,
@@ -336,7 +355,7 @@ class SNNCompiler:
         for target_id_seq in range(target_start, target_end + 1):
             # Convert sequential ID to encoded ID
             target_id = self.sequential_to_encoded.get(target_id_seq, target_id_seq)
-            target_neuron = next(n for n in self.neurons if n.global_id == target_id)
+            target_neuron = self._neuron_by_gid[target_id]
             
             for source_id_seq in range(source_start, source_end + 1):
                 # Convert sequential ID to encoded ID for synapse
@@ -9,7 +9,7 @@ import struct
 import threading
 from typing import Dict, List, Optional, Tuple, Callable
 from dataclasses import dataclass
-from collections import deque
+from collections import defaultdict, deque
 
 
 @dataclass
@@ -87,7 +87,7 @@ class SNNEngine:
         Load neurons and synapses from parsed neuron table.
         
         Args:
-            parsed_neurons: List of ParsedNeuron objects from node.py
+            parsed_neurons: ParsedNeuron objects from node.py (list or NeuronTableView)
         """
         self.neurons.clear()
         self.synapses.clear()
@@ -129,23 +129,34 @@ class SNNEngine:
             neuron_id: Local neuron ID on this node
             value: Spike value (default 1.0)
         """
-        self.stats['total_spikes_received'] += 1
+        self.inject_spike_batch([(neuron_id, value)])
+    
+    def inject_spike_batch(self, spikes: List[Tuple[int, float]]):
+        """
+        Inject several external spikes in one pass (see inject_spike).
         
-        # Get the neuron
-        neuron = self.neurons.get(neuron_id)
-        if not neuron:
-            return
+        Args:
+            spikes: (neuron_id, value) pairs, applied in order
+        """
+        self.stats['total_spikes_received'] += len(spikes)
+        neurons = self.neurons
+        synapses = self.synapses
         
-        # For input neurons, directly generate a spike
-        # Input neurons typically have no incoming synapses
-        if not self.synapses.get(neuron_id):
-            # This is likely an input neuron - make it spike
-            self._generate_spike(neuron)
-        else:
-            # For non-input neurons, add to membrane potential
-            neuron.membrane_potential += value
-            if neuron.membrane_potential >= neuron.threshold:
+        for neuron_id, value in spikes:
+            neuron = neurons.get(neuron_id)
+            if not neuron:
+                continue
+            
+            # For input neurons, directly generate a spike
+            # Input neurons typically have no incoming synapses
+            if not synapses.get(neuron_id):
+                # This is likely an input neuron - make it spike
                 self._generate_spike(neuron)
+            else:
+                # For non-input neurons, add to membrane potential
+                neuron.membrane_potential += value
+                if neuron.membrane_potential >= neuron.threshold:
+                    self._generate_spike(neuron)
     
     def start(self, timestep_us: int = 1000):
         """
@@ -278,6 +289,11 @@ class ClusterSNNCoordinator:
     def __init__(self):
         """Initialize coordinator."""
         self.engines: Dict[Tuple[int, int], SNNEngine] = {}  # (backplane_id, node_id) -> engine
+        self._neuron_index: Optional[Dict[int, SNNEngine]] = None  # neuron_id -> engine, built lazily
+        
+        # Bumped on anything that changes get_global_activity() - lets API
+        # pollers skip unchanged snapshots
+        self.activity_seq = 0
         self.spike_routing_active = False
         self.routing_thread: Optional[threading.Thread] = None
         
@@ -289,6 +305,8 @@ class ClusterSNNCoordinator:
         """Register an SNN engine."""
         key = (engine.backplane_id, engine.node_id)
         self.engines[key] = engine
+        self._neuron_index = None
+        self.activity_seq += 1
         
         # Set spike callback to route spikes
         engine.spike_callback = self._route_spike
@@ -300,6 +318,8 @@ class ClusterSNNCoordinator:
             engine = self.engines[key]
             engine.stop()
             del self.engines[key]
+            self._neuron_index = None
+            self.activity_seq += 1
     
     def start_all(self, timestep_us: int = 1000):
         """Start all engines."""
@@ -308,12 +328,14 @@ class ClusterSNNCoordinator:
         
         # Start spike routing
         self.spike_routing_active = True
+        self.activity_seq += 1
         self.routing_thread = threading.Thread(target=self._routing_loop, daemon=True)
         self.routing_thread.start()
     
     def stop_all(self):
         """Stop all engines."""
         self.spike_routing_active = False
+        self.activity_seq += 1
         if self.routing_thread:
             self.routing_thread.join(timeout=1.0)
             self.routing_thread = None
@@ -327,12 +349,45 @@ class ClusterSNNCoordinator:
         engine = self.engines.get(key)
         if engine:
             engine.inject_spike(neuron_id, value)
+            self.activity_seq += 1
+    
+    def inject_spikes(self, spikes) -> int:
+        """
+        Inject external spikes by neuron ID, batched per engine.
+        
+        Each spike goes to the first registered engine holding that neuron.
+        
+        Args:
+            spikes: Iterable of (neuron_id, value) pairs
+            
+        Returns:
+            Number of spikes delivered to an engine
+        """
+        if self._neuron_index is None:
+            index = {}
+            for engine in self.engines.values():
+                for neuron_id in engine.neurons:
+                    index.setdefault(neuron_id, engine)
+            self._neuron_index = index
+        
+        batches = defaultdict(list)
+        for neuron_id, value in spikes:
+            engine = self._neuron_index.get(neuron_id)
+            if engine is not None:
+                batches[engine].append((neuron_id, value))
+        
+        for engine, batch in batches.items():
+            engine.inject_spike_batch(batch)
+        if batches:
+            self.activity_seq += 1
+        return sum(len(batch) for batch in batches.values())
     
     def _route_spike(self, spike: Spike):
         """Route spike to appropriate engines."""
         # Add to global buffer
         with self.buffer_lock:
             self.global_spike_buffer.append(spike)
+            self.activity_seq += 1
         
         # Broadcast to all engines (they will filter based on synapses)
         for engine in self.engines.values():
@@ -31,6 +31,8 @@ def create_backup():
     # Directories to exclude
     exclude_dirs = {
         'build',
+        'build_v1',
+        'build_v2',
         '.git',
         '__pycache__',
         '.vscode',